@@ -1,3 +1,7 @@
+from tfont.converters.tfontBinaryConverter import MappedFont, \
+    TFontBinaryConverter
 from tfont.converters.tfontConverter import TFontConverter
+from tfont.converters.tfontPackageConverter import TFontPackageConverter
+from tfont.converters.trueTypeConverter import TrueTypeConverter
 from tfont.converters.type2Converter import Type2Converter
 from tfont.converters.ufoConverter import UFOConverter
@@ -1 +1,5 @@
-from tfont.converters.openType.compiler import Type2FontCompiler
\ No newline at end of file
+from tfont.converters.openType.compiler import Type2FontCompiler, \
+    TrueTypeFontCompiler
+from tfont.converters.openType.family import FamilyCompiler
+from tfont.converters.openType.variable import VariableFontCompiler
+from tfont.converters.openType.instances import InstanceCompiler
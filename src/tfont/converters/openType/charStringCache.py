@@ -0,0 +1,88 @@
+import hashlib
+import os
+import tempfile
+
+
+class CharStringCache:
+    """
+    A persistent, content-addressed store of Type 2 charstring programs.
+
+    Entries are keyed by a hash of everything that goes into a glyph's
+    charstring: its flattened outline (with components decomposed), its
+    width and the compiler settings. An entry therefore never goes stale,
+    and glyphs that didn't change since the last build are not re-encoded.
+
+    Each program is stored in its own file under *directory*, written
+    atomically so that concurrent builds can share a cache.
+    """
+    __slots__ = "_directory", "_hits", "_misses"
+
+    # bump to invalidate existing entries when the encoding changes
+    version = 1
+
+    def __init__(self, directory):
+        self._directory = os.fspath(directory)
+        self._hits = self._misses = 0
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self._directory)
+
+    @property
+    def directory(self):
+        return self._directory
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    def key(self, contours, width, defaultWidthX, nominalWidthX,
+            roundTolerance, optimize):
+        """
+        Returns the hex digest that identifies a charstring, for flattened
+        *contours* as returned by drawing.flatten_layer().
+        """
+        h = hashlib.blake2b(digest_size=20)
+        h.update(repr((
+            self.version, width, defaultWidthX, nominalWidthX,
+            roundTolerance, bool(optimize))).encode())
+        for coordinates, flags in contours:
+            h.update(len(flags).to_bytes(4, "little"))
+            h.update(flags)
+            # repr keeps ints and floats apart, which the pen doesn't
+            h.update(repr(coordinates).encode())
+        return h.hexdigest()
+
+    def get(self, key):
+        """
+        Returns the bytecode stored under *key*, or None.
+        """
+        try:
+            with open(self._entry_path(key), "rb") as file:
+                bytecode = file.read()
+        except FileNotFoundError:
+            self._misses += 1
+            return None
+        self._hits += 1
+        return bytecode
+
+    def set(self, key, bytecode):
+        path = self._entry_path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmpPath = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(bytecode)
+            os.replace(tmpPath, path)
+        except BaseException:
+            os.unlink(tmpPath)
+            raise
+
+    #
+
+    def _entry_path(self, key):
+        return os.path.join(self._directory, key[:2], key[2:])
@@ -1,3 +1,4 @@
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from fontTools import ttLib
 from fontTools.cffLib import (
@@ -9,19 +10,48 @@ from fontTools.cffLib import (
     PrivateDict,
     IndexedStrings,
 )
+from fontTools.misc.psCharStrings import T2CharString
 from fontTools.misc.fixedTools import otRound
 from fontTools.pens.t2CharStringPen import T2CharStringPen
+from fontTools.pens.ttGlyphPen import TTGlyphPen
 from fontTools.ttLib.tables._c_m_a_p import cmap_format_4, cmap_format_12
 from fontTools.ttLib.tables.O_S_2f_2 import Panose
 from tfont.converters.openType import conversion, drawing, semlog
+from tfont.converters.openType.charStringCache import CharStringCache
 from tfont.converters.openType.fontdata import FontData, FontProc
+from tfont.converters.openType.subroutinizer import Subroutinizer
 from tfont.converters.openType.types import Context
+from tfont.objects.misc import Rectangle
 
 
 def otRoundSequence(iterable):
     return list(map(otRound, iterable))
 
 
+def encode_charstrings(glyphs, roundTolerance, optimize):
+    """
+    Encodes a batch of (width, flattened outline) glyphs to Type 2
+    charstring bytecode. Runs in worker processes, see
+    Type2FontCompiler.workers.
+    """
+    bytecodes = []
+    for width, contours in glyphs:
+        pen = T2CharStringPen(width, None, roundTolerance=roundTolerance)
+        drawing.draw_flattened(contours, pen)
+        charString = pen.getCharString(optimize=optimize)
+        charString.compile()
+        bytecodes.append(charString.bytecode)
+    return bytecodes
+
+
+def convert_to_quadratic(glyphs, maxErr):
+    """
+    Converts a batch of flattened glyph outlines to quadratic splines. Runs
+    in worker processes, see TrueTypeFontCompiler.workers.
+    """
+    return [drawing.quadratic_contours(contours, maxErr) for contours in glyphs]
+
+
 class BaseFontCompiler:
     sfntVersion = NotImplemented
 
@@ -33,6 +63,9 @@ class BaseFontCompiler:
             master = font.masterForName(mastername)
         self.ctx = Context(font, master)
         self.metadataProvider = FontData
+        self.otf = None
+        # FamilyData shared with the compilers of other masters, if any
+        self.familyData = None
 
     def compile(self):
         self.otf = ttLib.TTFont(sfntVersion=self.sfntVersion)
@@ -55,13 +88,77 @@ class BaseFontCompiler:
 
         return (self.otf, self.ctx.log)
 
+    def update(self, glyphNames=(), fontInfo=False):
+        """
+        Updates the font of the last compile() after changes to the glyphs
+        named in *glyphNames* and, if *fontInfo* is true, to font-wide
+        attributes (info, master metrics, alignment zones...). Only what
+        depends on the changes is rebuilt; glyphs that use changed glyphs as
+        components are updated too.
+
+        Runs a full compile() if there is no previous build or the glyph set
+        changed. Returns (otf, log) like compile().
+        """
+        # shared data describes the font as it was, recompute
+        self.familyData = None
+        if self.otf is None:
+            return self.compile()
+        ctx = self.ctx
+        glyphMap, glyphOrder = FontProc.production_glyphs(ctx)
+        if glyphOrder != self.glyphOrder:
+            return self.compile()
+        self.glyphMap = glyphMap
+        glyphNames = FontProc.component_dependents(ctx, glyphMap, glyphNames)
+
+        if fontInfo:
+            # generated glyphs (e.g. .notdef) are drawn from font metrics
+            font = ctx.font
+            glyphNames |= FontProc.component_dependents(ctx, glyphMap, (
+                glyphName for glyphName, glyph in glyphMap.items()
+                if glyph.font is not font))
+            # most tables read font attributes, rebuild them all but keep
+            # the outlines of unchanged glyphs
+            self.keep_outlines(glyphNames)
+            return self.compile()
+
+        self.update_outlines(glyphNames)
+        hmtx = self.otf["hmtx"]
+        for glyphName in glyphNames:
+            hmtx[glyphName] = self.glyph_metrics(glyphName, glyphMap[glyphName])
+        self.fontBounds = FontProc.font_bounds(ctx, self.glyphBoundsMap)
+
+        unicodeToGlyphNameMap = FontProc.unicode_glyphname_map(ctx, glyphMap)
+        if unicodeToGlyphNameMap != self.unicodeToGlyphNameMap:
+            self.unicodeToGlyphNameMap = unicodeToGlyphNameMap
+            self.build_cmap()
+
+        # bounds, extents, average width and unicode ranges
+        self.build_head()
+        self.build_hhea()
+        self.build_OS2()
+
+        self.update_others(glyphNames)
+
+        return (self.otf, ctx.log)
+
     ##
 
     def build_requirements(self):
         ctx = self.ctx
-        self.glyphMap, self.glyphOrder = FontProc.production_glyphs(ctx)
+        self.build_glyph_maps()
         self.fontBounds, self.glyphBoundsMap = FontProc.font_glyph_bounds(ctx, self.glyphMap)
-        self.unicodeToGlyphNameMap = FontProc.unicode_glyphname_map(ctx, self.glyphMap)
+
+    def build_glyph_maps(self):
+        ctx = self.ctx
+        family = self.familyData
+        if family is not None:
+            ctx.log.extend(family.log)
+            self.glyphMap = family.glyphMap
+            self.glyphOrder = family.glyphOrder
+            self.unicodeToGlyphNameMap = family.unicodeToGlyphNameMap
+        else:
+            self.glyphMap, self.glyphOrder = FontProc.production_glyphs(ctx)
+            self.unicodeToGlyphNameMap = FontProc.unicode_glyphname_map(ctx, self.glyphMap)
 
     def build_cmap(self):
         self.otf["cmap"] = cmap = ttLib.newTable("cmap")
@@ -190,17 +287,11 @@ class BaseFontCompiler:
         hhea.numberOfHMetrics = len(self.glyphOrder)
 
     def build_hmtx(self):
-        ctx = self.ctx
-        data = self.metadataProvider
         self.otf["hmtx"] = hmtx = ttLib.newTable("hmtx")
         hmtx.metrics = {}
 
         for glyphName, glyph in self.glyphMap.items():
-            width = otRound(data.glyph_width(ctx, glyph))
-            bounds = self.glyphBoundsMap[glyphName]
-            left = otRound(bounds.left) if not bounds.empty else 0
-
-            hmtx[glyphName] = (width, left)
+            hmtx[glyphName] = self.glyph_metrics(glyphName, glyph)
 
     def build_maxp(self):
         raise NotImplementedError
@@ -297,10 +388,13 @@ class BaseFontCompiler:
         else:
             os2.recalcUnicodeRanges(self.otf)
 
-        codepageRanges = data.OS2_codepageRanges(ctx)
-        if codepageRanges is None:
-            codepageRanges = FontProc.codepage_ranges(
-                ctx, self.unicodeToGlyphNameMap.keys())
+        if self.familyData is not None:
+            codepageRanges = self.familyData.codepageRanges
+        else:
+            codepageRanges = data.OS2_codepageRanges(ctx)
+            if codepageRanges is None:
+                codepageRanges = FontProc.codepage_ranges(
+                    ctx, self.unicodeToGlyphNameMap.keys())
         os2.ulCodePageRange1 = conversion.to_bitflags(codepageRanges, 0, 32)
         os2.ulCodePageRange2 = conversion.to_bitflags(codepageRanges, 32, 32)
 
@@ -343,12 +437,54 @@ class BaseFontCompiler:
     def build_others(self):
         pass
 
+    #
+
+    def glyph_metrics(self, glyphName, glyph):
+        ctx = self.ctx
+        data = self.metadataProvider
+
+        width = otRound(data.glyph_width(ctx, glyph))
+        bounds = self.glyphBoundsMap[glyphName]
+        left = otRound(bounds.left) if not bounds.empty else 0
+        return (width, left)
+
+    def keep_outlines(self, glyphNames):
+        """
+        Called by update() before recompiling the font from scratch. Can
+        hold on to the compiled outlines of the glyphs not in *glyphNames*
+        for reuse.
+        """
+        pass
+
+    def update_outlines(self, glyphNames):
+        """
+        Called by update() to update the outlines and bounds of *glyphNames*,
+        before metrics are recomputed.
+        """
+        ctx = self.ctx
+        glyphMap = self.glyphMap
+        glyphBoundsMap = self.glyphBoundsMap
+        for glyphName in glyphNames:
+            glyphBoundsMap[glyphName] = FontProc.glyph_bounds(
+                ctx, glyphMap[glyphName])
+
+    def update_others(self, glyphNames):
+        """
+        Called by update() to update the tables built by build_others() after
+        changes to *glyphNames*.
+        """
+        pass
+
 
 class Type2FontCompiler(BaseFontCompiler):
     sfntVersion = "OTTO"
 
+    # glyphs per batch sent to worker processes
+    workerBatchSize = 256
+
     def __init__(self, font, mastername=None,
-                 roundTolerance=None, optimizeCFF=True):
+                 roundTolerance=None, optimizeCFF=True, workers=None,
+                 cache=None, subroutinize=False):
         if roundTolerance is not None:
             self.roundTolerance = float(roundTolerance)
         else:
@@ -356,6 +492,18 @@ class Type2FontCompiler(BaseFontCompiler):
             self.roundTolerance = 0.5
         super().__init__(font, mastername)
         self.optimizeCFF = optimizeCFF
+        # number of processes that encode charstrings, serial if None or 1
+        self.workers = workers
+        # CharStringCache, or the path of its directory
+        if cache is not None and not isinstance(cache, CharStringCache):
+            cache = CharStringCache(cache)
+        self.cache = cache
+        # True or a Subroutinizer, to share charstring fragments in global
+        # subroutines
+        if subroutinize is True:
+            subroutinize = Subroutinizer(workers=workers)
+        self.subroutinizer = subroutinize or None
+        self._keptCharStrings = None
 
     def build_CFF(self):
         ctx = self.ctx
@@ -464,10 +612,24 @@ class Type2FontCompiler(BaseFontCompiler):
             private.rawDict["StemSnapV"] = stemSnapV
             private.rawDict["StdVW"] = stemSnapV[0]
         # populate glyphs
+        charStringsMap = {}
+        kept = self._keptCharStrings
+        self._keptCharStrings = None
+        if kept is not None:
+            widths, keptCharStrings = kept
+            # charstring widths are relative to these
+            if widths == (private.defaultWidthX, private.nominalWidthX):
+                for glyphName, charString in keptCharStrings.items():
+                    charString.private = private
+                    charString.globalSubrs = globalSubrs
+                    charStringsMap[glyphName] = charString
+        glyphNames = [
+            glyphName for glyphName in self.glyphOrder
+            if glyphName not in charStringsMap]
+        charStringsMap.update(zip(
+            glyphNames, self.draw_charstrings(glyphNames, private, globalSubrs)))
         for glyphName in self.glyphOrder:
-            glyph = self.glyphMap[glyphName]
-            charString = self.draw_charstring(glyph, private, globalSubrs)
-
+            charString = charStringsMap[glyphName]
             # add to the font
             charStringsIndex.append(charString)
             glyphID = len(topDict.charset)
@@ -483,13 +645,60 @@ class Type2FontCompiler(BaseFontCompiler):
 
     def build_others(self):
         self.build_CFF()
+        if self.subroutinizer is not None:
+            self.subroutinize_CFF()
+
+    def subroutinize_CFF(self):
+        cff = self.otf["CFF "].cff
+        topDict = cff.topDictIndex[0]
+        self.subroutinizer.subroutinize(
+            topDict.CharStrings.charStringsIndex.items,
+            cff.GlobalSubrs,
+            topDict.Private,
+        )
+
+    def keep_outlines(self, glyphNames):
+        cff = self.otf["CFF "].cff
+        if cff.GlobalSubrs:
+            # charstrings refer to the subroutines, which will be redone
+            return
+        topDict = cff.topDictIndex[0]
+        private = topDict.Private
+        charStrings = topDict.CharStrings
+        self._keptCharStrings = (
+            (private.defaultWidthX, private.nominalWidthX),
+            {glyphName: charStrings[glyphName]
+             for glyphName in charStrings.keys()
+             if glyphName not in glyphNames},
+        )
+
+    def update_others(self, glyphNames):
+        ctx = self.ctx
+        cff = self.otf["CFF "].cff
+        topDict = cff.topDictIndex[0]
+        private = topDict.Private
+        widths = FontProc.postscript_width_stats(ctx, self.otf)
+        if widths != (private.defaultWidthX, private.nominalWidthX):
+            # all charstring widths are relative to these
+            self.build_others()
+            return
+        # changed glyphs are left out of subroutines until the next full
+        # compile()
+        charStrings = topDict.CharStrings
+        glyphNames = [
+            glyphName for glyphName in self.glyphOrder
+            if glyphName in glyphNames]
+        for glyphName, charString in zip(glyphNames, self.draw_charstrings(
+                glyphNames, private, cff.GlobalSubrs)):
+            charStrings[glyphName] = charString
+        bounds = self.fontBounds
+        topDict.FontBBox = (bounds.left, bounds.bottom, bounds.right, bounds.top)
 
     #
 
-    def draw_charstring(self, glyph, private, globalSubrs):
+    def charstring_width(self, layer, private):
         ctx = self.ctx
         data = self.metadataProvider
-        layer = data.glyph_layer(ctx, glyph)
 
         width = data.layer_width(ctx, layer)
         defaultWidth = private.defaultWidthX
@@ -502,8 +711,238 @@ class Type2FontCompiler(BaseFontCompiler):
             width -= nominalWidth
         if width is not None:
             width = otRound(width)
+        return width
+
+    def charstring_key(self, contours, width, private):
+        return self.cache.key(
+            contours, width, private.defaultWidthX, private.nominalWidthX,
+            self.roundTolerance, self.optimizeCFF)
 
-        pen = T2CharStringPen(width, self.glyphOrder, roundTolerance=self.roundTolerance)
-        drawing.draw_layer(layer, pen)
+    def draw_charstring(self, glyph, private, globalSubrs):
+        ctx = self.ctx
+        data = self.metadataProvider
+        layer = data.glyph_layer(ctx, glyph)
+
+        width = self.charstring_width(layer, private)
+        cache = self.cache
+        if cache is not None:
+            contours = drawing.flatten_layer(layer)
+            key = self.charstring_key(contours, width, private)
+            bytecode = cache.get(key)
+            if bytecode is None:
+                bytecode, = encode_charstrings(
+                    [(width, contours)], self.roundTolerance, self.optimizeCFF)
+                cache.set(key, bytecode)
+            return T2CharString(
+                bytecode=bytecode, private=private, globalSubrs=globalSubrs)
+        pen = T2CharStringPen(width, None, roundTolerance=self.roundTolerance)
+        drawing.draw_layer(layer, pen, decompose=True)
         charString = pen.getCharString(private, globalSubrs, optimize=self.optimizeCFF)
         return charString
+
+    def draw_charstrings(self, glyphNames, private, globalSubrs):
+        # a pool only pays off past a batch's worth of glyphs
+        workers = self.workers
+        if workers is not None and workers > 1 and \
+                len(glyphNames) > self.workerBatchSize:
+            return self.draw_charstrings_parallel(
+                glyphNames, private, globalSubrs)
+        glyphMap = self.glyphMap
+        return [
+            self.draw_charstring(glyphMap[glyphName], private, globalSubrs)
+            for glyphName in glyphNames
+        ]
+
+    def draw_charstrings_parallel(self, glyphNames, private, globalSubrs):
+        """
+        Encodes charstrings in a pool of self.workers processes. Outlines
+        are flattened here and sent in batches; the bytecode that comes back
+        is identical to the serial output.
+
+        Glyphs found in the cache are not sent to workers.
+        """
+        ctx = self.ctx
+        data = self.metadataProvider
+        cache = self.cache
+        bytecodes = []
+        # (index, cache key) of the glyphs to encode
+        missing = []
+        glyphs = []
+        for glyphName in glyphNames:
+            layer = data.glyph_layer(ctx, self.glyphMap[glyphName])
+            width = self.charstring_width(layer, private)
+            contours = drawing.flatten_layer(layer)
+            key = None
+            if cache is not None:
+                key = self.charstring_key(contours, width, private)
+                bytecode = cache.get(key)
+                if bytecode is not None:
+                    bytecodes.append(bytecode)
+                    continue
+            missing.append((len(bytecodes), key))
+            bytecodes.append(None)
+            glyphs.append((width, contours))
+
+        if glyphs:
+            size = self.workerBatchSize
+            batches = [glyphs[i:i + size] for i in range(0, len(glyphs), size)]
+            with ProcessPoolExecutor(self.workers) as executor:
+                results = executor.map(
+                    encode_charstrings,
+                    batches,
+                    [self.roundTolerance] * len(batches),
+                    [self.optimizeCFF] * len(batches),
+                )
+                encoded = (bytecode for batch in results for bytecode in batch)
+                for (index, key), bytecode in zip(missing, encoded):
+                    bytecodes[index] = bytecode
+                    if key is not None:
+                        cache.set(key, bytecode)
+        return [
+            T2CharString(
+                bytecode=bytecode, private=private, globalSubrs=globalSubrs)
+            for bytecode in bytecodes
+        ]
+
+
+class TrueTypeFontCompiler(BaseFontCompiler):
+    sfntVersion = "\x00\x01\x00\x00"
+
+    # glyphs per batch sent to worker processes
+    workerBatchSize = 256
+
+    def __init__(self, font, mastername=None,
+                 maxErr=None, reverseDirection=True, workers=None):
+        super().__init__(font, mastername)
+        # maximum distance between cubic curves and their quadratic
+        # conversion, in font units. defaults to 1/1000 em
+        if maxErr is None:
+            maxErr = .001 * FontData.unitsPerEm(self.ctx)
+        self.maxErr = maxErr
+        # TrueType contours go clockwise, the other way round from PostScript
+        self.reverseDirection = reverseDirection
+        # number of processes that convert curves, serial if None or 1
+        self.workers = workers
+        self._keptGlyphs = None
+
+    def build_requirements(self):
+        ctx = self.ctx
+        self.build_glyph_maps()
+        self.glyfTable = glyf = ttLib.newTable("glyf")
+        glyf.glyphOrder = self.glyphOrder
+        glyf.glyphs = {}
+        self.glyphSet = {}
+        self.glyphBoundsMap = {}
+
+        kept = self._keptGlyphs
+        self._keptGlyphs = None
+        if kept is not None:
+            for glyphName, (flattenedGlyph, ttGlyph) in kept.items():
+                if glyphName in self.glyphMap:
+                    self.glyphSet[glyphName] = flattenedGlyph
+                    glyf.glyphs[glyphName] = ttGlyph
+                    self.glyphBoundsMap[glyphName] = self.glyf_bounds(glyphName)
+        self.update_outlines([
+            glyphName for glyphName in self.glyphOrder
+            if glyphName not in glyf.glyphs])
+
+        self.fontBounds = FontProc.font_bounds(ctx, self.glyphBoundsMap)
+
+    def build_glyf(self):
+        self.otf["loca"] = ttLib.newTable("loca")
+        self.otf["glyf"] = self.glyfTable
+
+    def build_maxp(self):
+        self.otf["maxp"] = maxp = ttLib.newTable("maxp")
+        maxp.tableVersion = 0x00010000
+        maxp.numGlyphs = len(self.glyphOrder)
+        maxp.maxZones = 1
+        maxp.maxTwilightPoints = 0
+        maxp.maxStorage = 0
+        maxp.maxFunctionDefs = 0
+        maxp.maxInstructionDefs = 0
+        maxp.maxStackElements = 0
+        maxp.maxSizeOfInstructions = 0
+        # the outline stats are recalculated from glyf when the font is saved
+        maxp.maxPoints = 0
+        maxp.maxContours = 0
+        maxp.maxCompositePoints = 0
+        maxp.maxCompositeContours = 0
+        maxp.maxComponentElements = 0
+        maxp.maxComponentDepth = 0
+
+    def build_others(self):
+        self.build_glyf()
+
+    def keep_outlines(self, glyphNames):
+        glyphs = self.glyfTable.glyphs
+        self._keptGlyphs = {
+            glyphName: (flattenedGlyph, glyphs[glyphName])
+            for glyphName, flattenedGlyph in self.glyphSet.items()
+            if glyphName not in glyphNames
+        }
+
+    def update_outlines(self, glyphNames):
+        glyphSet = self.glyphSet
+        glyphs = self.glyfTable.glyphs
+
+        self.convert_glyphs(glyphNames)
+        # components are resolved through the glyph set, so it must be
+        # complete before drawing
+        for glyphName in glyphNames:
+            pen = TTGlyphPen(glyphSet)
+            glyphSet[glyphName].draw(pen)
+            glyphs[glyphName] = pen.glyph()
+
+        glyphBoundsMap = self.glyphBoundsMap
+        for glyphName in glyphNames:
+            glyphBoundsMap[glyphName] = self.glyf_bounds(glyphName)
+
+    #
+
+    def convert_glyphs(self, glyphNames):
+        """
+        Stores the quadratic outlines of *glyphNames* in self.glyphSet.
+        """
+        ctx = self.ctx
+        data = self.metadataProvider
+        glyphMap = self.glyphMap
+        glyphSet = self.glyphSet
+        reverse = self.reverseDirection
+
+        layers = [
+            data.glyph_layer(ctx, glyphMap[glyphName]) for glyphName in glyphNames]
+        quadraticContours = self.convert_outlines(
+            [drawing.flatten_paths(layer) for layer in layers])
+        for glyphName, layer, contours in zip(
+                glyphNames, layers, quadraticContours):
+            glyphSet[glyphName] = drawing.FlattenedGlyph(
+                contours, drawing.layer_components(layer), reverse)
+
+    def glyf_bounds(self, glyphName):
+        # measure the quadratic outline, hmtx sidebearings must match glyf
+        glyf = self.glyfTable
+        ttGlyph = glyf.glyphs[glyphName]
+        if not ttGlyph.numberOfContours:
+            return Rectangle.create_empty()
+        ttGlyph.recalcBounds(glyf)
+        return Rectangle.from_points(
+            ttGlyph.xMin, ttGlyph.yMin, ttGlyph.xMax, ttGlyph.yMax)
+
+    def convert_outlines(self, glyphs, function=convert_to_quadratic):
+        """
+        Converts a list of flattened glyph outlines to quadratic splines with
+        *function*, in a pool of self.workers processes if set.
+        """
+        workers = self.workers
+        if workers is None or workers <= 1 or len(glyphs) <= self.workerBatchSize:
+            return function(glyphs, self.maxErr)
+        size = self.workerBatchSize
+        batches = [glyphs[i:i + size] for i in range(0, len(glyphs), size)]
+        with ProcessPoolExecutor(workers) as executor:
+            results = executor.map(
+                function,
+                batches,
+                [self.maxErr] * len(batches),
+            )
+            return [contours for batch in results for contours in batch]
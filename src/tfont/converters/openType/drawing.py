@@ -1,22 +1,304 @@
+from fontTools.cu2qu import curve_to_quadratic, curves_to_quadratic
+from fontTools.pens.basePen import decomposeSuperBezierSegment
+from fontTools.pens.reverseContourPen import ReverseContourPen
+from fontTools.pens.transformPen import TransformPen
+from tfont.objects.compactPath import CompactPath, OFFCURVE, CURVE, LINE, \
+    MOVE, POINT_MASK, QCURVE, SMOOTH, TYPE_MASK, point_flags
 
+# flags -> type and smooth bytes table, without the integer coordinates bits
+_pointTable = bytes(flags & POINT_MASK for flags in range(256))
 
-def draw_layer(layer, pen):
+
+def draw_layer(layer, pen, decompose=False):
     for path in layer.paths:
         draw_path(path, pen)
     for component in layer.components:
-        draw_component(component, pen)
+        draw_component(component, pen, decompose)
+
+
+def flatten_layer(layer):
+    """
+    Returns the outline of *layer* as a list of (coordinates, flags) pairs
+    in the CompactPath buffer layout, with components decomposed. This is a
+    compact, picklable form of the outline that draw_flattened() renders.
+
+    Coordinates are kept in lists rather than arrays so that ints stay ints,
+    which matters to pens that don't round.
+    """
+    contours = flatten_paths(layer)
+    for component in layer._components:
+        base = component.layer
+        if base is None:
+            continue
+        # same arithmetic as fontTools' TransformPen, one component level at
+        # a time, so that the result is identical to decomposing while drawing
+        xx, xy, yx, yy, dx, dy = component.transformation
+        for coordinates, flags in flatten_layer(base):
+            for i in range(0, len(coordinates), 2):
+                x, y = coordinates[i], coordinates[i + 1]
+                coordinates[i] = xx * x + yx * y + dx
+                coordinates[i + 1] = xy * x + yy * y + dy
+            contours.append((coordinates, flags))
+    return contours
+
+
+def flatten_paths(layer):
+    """
+    Returns the paths of *layer* in the form of flatten_layer(), leaving
+    components out.
+    """
+    contours = []
+    for path in layer._paths:
+        if path.__class__ is CompactPath:
+            coordinates = path._coordinates.tolist()
+            flags = bytes(path._flags.translate(_pointTable))
+        else:
+            points = path._points
+            coordinates = []
+            for point in points:
+                coordinates.append(point._x)
+                coordinates.append(point._y)
+            flags = bytes(
+                point_flags(point._type, point.smooth) for point in points)
+        contours.append((coordinates, flags))
+    return contours
+
+
+def draw_flattened(contours, pen):
+    path = CompactPath()
+    for coordinates, flags in contours:
+        path._coordinates = coordinates
+        path._flags = flags
+        draw_compact_path(path, pen)
+
+
+def quadratic_contours(contours, maxErr):
+    """
+    Converts the cubic curves of flattened *contours* to quadratic splines
+    that deviate at most *maxErr* units from them.
+    """
+    result = []
+    for coordinates, flags in contours:
+        if not any(flags_ & TYPE_MASK == CURVE for flags_ in flags):
+            result.append((coordinates, flags))
+            continue
+        # closed contours start from their last point
+        if flags[0] & TYPE_MASK == MOVE:
+            previous = (coordinates[0], coordinates[1])
+        else:
+            previous = (coordinates[-2], coordinates[-1])
+        quadCoordinates = []
+        quadFlags = bytearray()
+        offCurves = []
+        for index, flags_ in enumerate(flags):
+            pt = (coordinates[2 * index], coordinates[2 * index + 1])
+            type_ = flags_ & TYPE_MASK
+            if type_ == OFFCURVE:
+                offCurves.append(pt)
+                continue
+            # a curve with a single off-curve is already quadratic, as pens
+            # take it
+            if type_ == CURVE and len(offCurves) == 1:
+                _append_spline(
+                    quadCoordinates, quadFlags, (previous, offCurves[0], pt),
+                    flags_ & SMOOTH)
+                previous = pt
+            elif type_ == CURVE and offCurves:
+                smooth = flags_ & SMOOTH
+                segments = decomposeSuperBezierSegment(offCurves + [pt])
+                for pt1, pt2, pt3 in segments:
+                    spline = curve_to_quadratic(
+                        (previous, pt1, pt2, pt3), maxErr)
+                    _append_spline(quadCoordinates, quadFlags, spline, smooth)
+                    previous = pt3
+            else:
+                _append_points(quadCoordinates, quadFlags, offCurves, pt, flags_)
+                previous = pt
+            offCurves = []
+        result.append((quadCoordinates, bytes(quadFlags)))
+    return result
+
+
+def compatible_quadratic_contours(masterContours, maxErr):
+    """
+    Converts the flattened contours of several masters of a glyph to
+    quadratic splines that have the same structure, so that they can be
+    interpolated.
+
+    Raises ValueError if the masters' outlines aren't compatible.
+    """
+    first = masterContours[0]
+    for contours in masterContours:
+        if len(contours) != len(first):
+            raise ValueError("masters have different contour counts")
+    maxErrors = [maxErr] * len(masterContours)
+    results = [[] for _ in masterContours]
+    for index, (_, flags) in enumerate(first):
+        types = bytes(flags_ & TYPE_MASK for flags_ in flags)
+        contours = [contours[index] for contours in masterContours]
+        for _, masterFlags in contours:
+            if bytes(flags_ & TYPE_MASK for flags_ in masterFlags) != types:
+                raise ValueError("masters have different point structures")
+        if CURVE not in types:
+            for result, contour in zip(results, contours):
+                result.append(contour)
+            continue
+        # closed contours start from their last point
+        if types[0] == MOVE:
+            previous = [(coordinates[0], coordinates[1])
+                        for coordinates, _ in contours]
+        else:
+            previous = [(coordinates[-2], coordinates[-1])
+                        for coordinates, _ in contours]
+        quadContours = [([], bytearray()) for _ in contours]
+        offCurves = []
+        for pointIndex, type_ in enumerate(types):
+            pts = [(coordinates[2 * pointIndex], coordinates[2 * pointIndex + 1])
+                   for coordinates, _ in contours]
+            if type_ == OFFCURVE:
+                offCurves.append(pts)
+                continue
+            # a curve with a single off-curve is already quadratic
+            if type_ == CURVE and len(offCurves) == 1:
+                for master, (quadCoordinates, quadFlags) in enumerate(
+                        quadContours):
+                    _append_spline(
+                        quadCoordinates, quadFlags,
+                        (previous[master], offCurves[0][master], pts[master]),
+                        contours[master][1][pointIndex] & SMOOTH)
+                previous = pts
+            elif type_ == CURVE and offCurves:
+                masterSegments = [
+                    decomposeSuperBezierSegment(
+                        [offCurve[master] for offCurve in offCurves] + [pt])
+                    for master, pt in enumerate(pts)]
+                for segments in zip(*masterSegments):
+                    splines = curves_to_quadratic([
+                        (prev,) + segment
+                        for prev, segment in zip(previous, segments)
+                    ], maxErrors)
+                    for (quadCoordinates, quadFlags), spline, (_, flags) in zip(
+                            quadContours, splines, contours):
+                        _append_spline(
+                            quadCoordinates, quadFlags, spline,
+                            flags[pointIndex] & SMOOTH)
+                    previous = [segment[-1] for segment in segments]
+            else:
+                for master, (quadCoordinates, quadFlags) in enumerate(quadContours):
+                    _append_points(
+                        quadCoordinates, quadFlags,
+                        [offCurve[master] for offCurve in offCurves],
+                        pts[master], contours[master][1][pointIndex])
+                previous = pts
+            offCurves = []
+        for result, (quadCoordinates, quadFlags) in zip(results, quadContours):
+            result.append((quadCoordinates, bytes(quadFlags)))
+    return results
+
+
+def layer_components(layer):
+    return [(component.glyphName, tuple(component.transformation))
+            for component in layer._components]
+
+
+def _append_points(coordinates, flags, offCurves, pt, ptFlags):
+    for x, y in offCurves:
+        coordinates.append(x)
+        coordinates.append(y)
+        flags.append(OFFCURVE)
+    coordinates.append(pt[0])
+    coordinates.append(pt[1])
+    flags.append(ptFlags)
+
+
+def _append_spline(coordinates, flags, spline, smooth):
+    for x, y in spline[1:-1]:
+        coordinates.append(x)
+        coordinates.append(y)
+        flags.append(OFFCURVE)
+    coordinates.append(spline[-1][0])
+    coordinates.append(spline[-1][1])
+    flags.append(QCURVE | smooth)
+
+
+class FlattenedGlyph:
+    """
+    A glyph made of flattened contours and components, that can be put in
+    the glyph set of pens that resolve components (e.g. TTGlyphPen).
+    """
+    __slots__ = "_contours", "_components", "_reverse"
+
+    def __init__(self, contours, components, reverse=False):
+        self._contours = contours
+        self._components = components
+        self._reverse = reverse
+
+    def draw(self, pen):
+        if self._reverse:
+            pen = ReverseContourPen(pen)
+        draw_flattened(self._contours, pen)
+        for glyphName, transformation in self._components:
+            pen.addComponent(glyphName, transformation)
 
 #
 
 
-def draw_component(component, pen):
+def draw_component(component, pen, decompose=False):
+    if decompose:
+        layer = component.layer
+        if layer is not None:
+            draw_layer(
+                layer,
+                TransformPen(pen, tuple(component.transformation)),
+                decompose
+            )
+        return
     pen.addComponent(
         component.glyphName,
         tuple(component.transformation)
     )
 
 
+def draw_compact_path(path, pen):
+    coordinates = path._coordinates
+    flags = path._flags
+    count = len(flags)
+    if not count:
+        return
+    open_ = skip = flags[0] & TYPE_MASK == MOVE
+    if open_:
+        pen.moveTo((coordinates[0], coordinates[1]))
+    else:
+        assert flags[-1] & TYPE_MASK
+        pen.moveTo((coordinates[-2], coordinates[-1]))
+    stack = []
+    for index in range(count):
+        if skip:
+            skip = False
+            continue
+        type_ = flags[index] & TYPE_MASK
+        pt = (coordinates[2 * index], coordinates[2 * index + 1])
+        if type_ == LINE:
+            assert not stack
+            pen.lineTo(pt)
+        else:
+            stack.append(pt)
+            if type_ == CURVE:
+                pen.curveTo(*stack)
+                stack = []
+            elif type_ == QCURVE:
+                pen.qCurveTo(*stack)
+                stack = []
+    if open_:
+        pen.endPath()
+    else:
+        pen.closePath()
+
+
 def draw_path(path, pen):
+    if path.__class__ is CompactPath:
+        draw_compact_path(path, pen)
+        return
     points = path._points
     if not points:
         return
@@ -40,5 +322,10 @@ def draw_path(path, pen):
             if point.type == "curve":
                 pen.curveTo(*stack)
                 stack = []
-    if not open_:
+            elif point.type == "qcurve":
+                pen.qCurveTo(*stack)
+                stack = []
+    if open_:
+        pen.endPath()
+    else:
         pen.closePath()
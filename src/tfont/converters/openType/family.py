@@ -0,0 +1,178 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import io
+import multiprocessing
+import os
+from fontTools import ttLib
+from tfont.converters.openType.compiler import Type2FontCompiler
+from tfont.converters.openType.fontdata import FontData, FontProc
+from tfont.converters.openType.types import Context
+
+# the family being compiled, inherited by forked worker processes
+_family = None
+
+
+def compile_master(masterName):
+    """
+    Compiles a master of the current FamilyCompiler and returns its binary
+    and log. Runs in forked worker processes.
+    """
+    otf, log = _family.master_compiler(masterName).compile()
+    stream = io.BytesIO()
+    otf.save(stream)
+    return stream.getvalue(), log
+
+
+def save_master(masterName, path):
+    """
+    Compiles a master of the current FamilyCompiler to *path*. Runs in
+    forked worker processes.
+    """
+    return _family.save_master(masterName, path)
+
+
+class FamilyData:
+    """
+    The master-independent data of a font's compile: production glyphs
+    (with a .notdef that has a layer for each master), cmap and codepage
+    ranges.
+    """
+    __slots__ = "glyphMap", "glyphOrder", "unicodeToGlyphNameMap", \
+        "codepageRanges", "log"
+
+    def __init__(self, font, masters):
+        ctx = Context(font, masters[0])
+        self.glyphMap, self.glyphOrder = FontProc.production_glyphs(ctx)
+        notdef = self.glyphMap[".notdef"]
+        if notdef.font is not font:
+            # the generated .notdef is drawn from the master's metrics
+            for master in masters[1:]:
+                layer = FontProc.make_notdef(Context(font, master)).layers[0]
+                layer._parent = notdef
+                notdef._layers.append(layer)
+        self.unicodeToGlyphNameMap = FontProc.unicode_glyphname_map(
+            ctx, self.glyphMap)
+        codepageRanges = FontData.OS2_codepageRanges(ctx)
+        if codepageRanges is None:
+            codepageRanges = FontProc.codepage_ranges(
+                ctx, self.unicodeToGlyphNameMap.keys())
+        self.codepageRanges = codepageRanges
+        # messages from the shared steps, the compilers' logs are per master
+        self.log = ctx.log
+
+
+class FamilyCompiler:
+    """
+    Compiles several masters of a font, computing master-independent data
+    once.
+
+    Masters are compiled in a pool of *workers* processes if set (this
+    requires the fork start method, masters are compiled serially
+    otherwise). Extra keyword arguments go to *compilerClass*.
+    """
+
+    def __init__(self, font, masterNames=None,
+                 compilerClass=Type2FontCompiler, workers=None, **kwargs):
+        self.font = font
+        if masterNames is None:
+            masterNames = [master.name for master in font.masters]
+        self.masterNames = masterNames
+        self.compilerClass = compilerClass
+        self.workers = workers
+        self.compilerArgs = kwargs
+        self.familyData = None
+
+    def compile(self):
+        """
+        Returns a {masterName: (otf, log)} dict.
+        """
+        font = self.font
+        self.familyData = FamilyData(font, [
+            font.masterForName(masterName) for masterName in self.masterNames])
+
+        if self._use_pool():
+            global _family
+            _family = self
+            try:
+                with ProcessPoolExecutor(
+                        self.workers,
+                        mp_context=multiprocessing.get_context("fork")
+                        ) as executor:
+                    results = list(executor.map(compile_master, self.masterNames))
+            finally:
+                _family = None
+            return {
+                masterName: (ttLib.TTFont(io.BytesIO(data)), log)
+                for masterName, (data, log) in zip(self.masterNames, results)
+            }
+        return {
+            masterName: self.master_compiler(masterName).compile()
+            for masterName in self.masterNames
+        }
+
+    def save(self, directory):
+        """
+        Compiles the masters and saves each to *directory* as soon as it is
+        built, in a file named after its PostScript name. Generates
+        (path, ok, log) tuples as masters finish; fonts whose log has errors
+        are not saved.
+        """
+        font = self.font
+        self.familyData = FamilyData(font, [
+            font.masterForName(masterName) for masterName in self.masterNames])
+        paths = {
+            masterName: self.master_path(directory, masterName)
+            for masterName in self.masterNames
+        }
+
+        if self._use_pool():
+            global _family
+            _family = self
+            try:
+                with ProcessPoolExecutor(
+                        self.workers,
+                        mp_context=multiprocessing.get_context("fork")
+                        ) as executor:
+                    futures = {
+                        executor.submit(save_master, masterName, path): path
+                        for masterName, path in paths.items()
+                    }
+                    for future in as_completed(futures):
+                        yield (futures[future], *future.result())
+            finally:
+                _family = None
+            return
+        for masterName, path in paths.items():
+            yield (path, *self.save_master(masterName, path))
+
+    def master_compiler(self, masterName):
+        compiler = self.compilerClass(
+            self.font, masterName, **self.compilerArgs)
+        compiler.familyData = self.familyData
+        return compiler
+
+    def master_context(self, masterName):
+        return Context(self.font, self.font.masterForName(masterName))
+
+    def master_path(self, directory, masterName):
+        ctx = self.master_context(masterName)
+        extension = ".otf" if self.compilerClass.sfntVersion == "OTTO" else ".ttf"
+        return os.path.join(
+            directory, FontData.name_postscriptFontName(ctx) + extension)
+
+    def save_master(self, masterName, path):
+        otf, log = self.master_compiler(masterName).compile()
+
+        ok = not any(entry["level"] == "error" for entry in log)
+        if ok:
+            otf.save(path)
+
+        return ok, log
+
+    #
+
+    def _use_pool(self):
+        # workers inherit the family by forking
+        workers = self.workers
+        return workers is not None and workers > 1 and \
+            len(self.masterNames) > 1 and \
+            "fork" in multiprocessing.get_all_start_methods()
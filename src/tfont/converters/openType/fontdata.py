@@ -6,15 +6,6 @@ from tfont.objects import Glyph, Layer, Path, Point
 from tfont.objects.misc import Rectangle
 
 
-def rect_otRound(rectangle):
-    return Rectangle.from_points(
-        otRound(rectangle.left),
-        otRound(rectangle.bottom),
-        otRound(rectangle.right),
-        otRound(rectangle.top)
-    )
-
-
 class Assert:
 
     @staticmethod
@@ -227,6 +218,13 @@ class FontData:
 
         return float(version)
 
+    @classmethod
+    def instance(cls, ctx):
+        """
+        Returns the instance being compiled, whose names then apply, or None.
+        """
+        return ctx.instance
+
     @classmethod
     def italicAngle(cls, ctx):
         master = ctx.master
@@ -247,6 +245,9 @@ class FontData:
 
     @classmethod
     def name_postscriptFontName(cls, ctx):
+        instance = cls.instance(ctx)
+        if instance is not None and instance.postscriptFontName:
+            return instance.postscriptFontName
         preferredFamilyName = cls.name_preferredFamilyName(ctx)
         preferredSubfamilyName = cls.name_preferredSubfamilyName(ctx)
 
@@ -255,6 +256,9 @@ class FontData:
 
     @classmethod
     def name_postscriptFullName(cls, ctx):
+        instance = cls.instance(ctx)
+        if instance is not None and instance.postscriptFullName:
+            return instance.postscriptFullName
         preferredFamilyName = cls.name_preferredFamilyName(ctx)
         preferredSubfamilyName = cls.name_preferredSubfamilyName(ctx)
 
@@ -275,16 +279,22 @@ class FontData:
 
     @classmethod
     def name_preferredFamilyName(cls, ctx):
-        #master = ctx.master  # XXX: PFN is in Instance
         font = ctx.font
+        instance = cls.instance(ctx)
 
-        return font.familyName#master.familyName
+        if instance is not None:
+            return instance.preferredFamilyName or instance.familyName or \
+                font.familyName
+        return font.familyName
 
     @classmethod
     def name_preferredSubfamilyName(cls, ctx):
-        # XXX: PSN is in Instance
         master = ctx.master
+        instance = cls.instance(ctx)
 
+        if instance is not None:
+            return instance.preferredSubfamilyName or instance.styleName or \
+                master.name
         return master.name
 
     @classmethod
@@ -451,13 +461,33 @@ class FontData:
     @classmethod
     def stylemap_familyName(cls, ctx):
         font = ctx.font
-
+        instance = cls.instance(ctx)
+
+        if instance is not None:
+            if instance.familyName:
+                return instance.familyName
+            styleName = instance.styleName
+            if styleName and styleName.lower() not in cls.known_stylenames:
+                # e.g. Light is the regular style of its own family
+                return f"{font.familyName} {styleName}"
         return font.familyName
 
     @classmethod
     def stylemap_styleName(cls, ctx):
         master = ctx.master
-        styleName = master.name.lower()
+        instance = cls.instance(ctx)
+
+        if instance is not None:
+            if instance.familyName:
+                # style-linked instance, bold and italic say which of the four
+                styleName = " ".join(
+                    name for name, flag in (
+                        ("bold", instance.bold), ("italic", instance.italic))
+                    if flag)
+                return styleName or "regular"
+            styleName = instance.styleName.lower()
+        else:
+            styleName = master.name.lower()
 
         if styleName in cls.known_stylenames:
             return styleName
@@ -613,21 +643,48 @@ class FontProc:
 
         return codepageRanges
 
+    @staticmethod
+    def component_dependents(ctx, glyphMap, glyphNames):
+        """
+        Returns the names in *glyphNames*, plus those of the glyphs that use
+        them as components, directly or not.
+        """
+        users = {}
+        for glyphName, glyph in glyphMap.items():
+            for component in FontData.glyph_layer(ctx, glyph)._components:
+                users.setdefault(component.glyphName, []).append(glyphName)
+        dependents = set(glyphNames)
+        stack = list(dependents)
+        while stack:
+            for glyphName in users.get(stack.pop(), ()):
+                if glyphName not in dependents:
+                    dependents.add(glyphName)
+                    stack.append(glyphName)
+        return dependents
+
+    @staticmethod
+    def font_bounds(ctx, glyphBoundsMap):
+        fontBounds = Rectangle.create_empty()
+        fontBounds.unionAll(glyphBoundsMap.values())
+        return fontBounds
+
     @staticmethod
     def font_glyph_bounds(ctx, glyphMap):
         glyphBoundsMap = {}
 
-        fontBounds = Rectangle.create_empty()
+        # Layer.bounds measures curves at their extrema, resolves components
+        # through their base layer and is cached, so that each glyph outline
+        # is only measured once even when used in many components
         for glyphName, glyph in glyphMap.items():
-            rectangle = Rectangle.create_empty()
-            for path in glyph.layers[0].paths:
-                for point in path.points:
-                    rectangle.unionPt(point.x, point.y)
-            if not rectangle.empty:
-                rectangle = rect_otRound(rectangle)
-            glyphBoundsMap[glyphName] = rectangle
-            fontBounds.union(rectangle)
-        return fontBounds, glyphBoundsMap
+            glyphBoundsMap[glyphName] = FontProc.glyph_bounds(ctx, glyph)
+        return FontProc.font_bounds(ctx, glyphBoundsMap), glyphBoundsMap
+
+    @staticmethod
+    def glyph_bounds(ctx, glyph):
+        bounds = FontData.glyph_layer(ctx, glyph).bounds
+        if bounds is not None:
+            return Rectangle.from_points(*map(otRound, bounds))
+        return Rectangle.create_empty()
 
     @staticmethod
     def minmax_cids(ctx, unicodes):
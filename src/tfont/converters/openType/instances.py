@@ -0,0 +1,126 @@
+import attr
+from tfont.converters.openType import semlog
+from tfont.converters.openType.compiler import Type2FontCompiler
+from tfont.converters.openType.family import FamilyCompiler
+from tfont.converters.openType.types import Context
+from tfont.objects import Font, Glyph, Interpolator, Layer
+from tfont.objects.interpolation import MasterData
+
+
+def instance_font(font, instances=None, interpolator=None, log=None):
+    """
+    Returns a static font with a master for each of *instances* (all of the
+    font's instances if None), named after its style name and holding the
+    glyphs interpolated at its location. The instances are copied over, in
+    the order of the masters.
+
+    Glyphs whose masters are incompatible keep the outlines of the default
+    master, with a warning appended to *log* if given.
+    """
+    if instances is None:
+        instances = list(font.instances)
+    if interpolator is None:
+        interpolator = Interpolator(font)
+    defaultMaster = interpolator.defaultMaster
+
+    masters = []
+    for instance in instances:
+        name = instance.styleName or "Regular"
+        if any(master.name == name for master in masters):
+            raise ValueError(f"several instances are named '{name}'")
+        masters.append(interpolator.interpolateMaster(instance.location, name))
+
+    glyphs = []
+    for glyph in font.glyphs:
+        glyphName = glyph.name
+        fallback = None
+        layers = []
+        for master in masters:
+            location = master.location
+            layer = interpolator.interpolateGlyph(glyphName, location)
+            if layer is None:
+                if fallback is None:
+                    fallback = _fallback_data(glyph, defaultMaster, log)
+                layer = fallback.interpolate([1.], location)
+            layer.masterName = master.name
+            layer.location = None
+            layers.append(layer)
+        extraData = glyph._extraData
+        glyphs.append(Glyph(
+            glyphName,
+            list(glyph.unicodes),
+            leftKerningGroup=glyph.leftKerningGroup,
+            rightKerningGroup=glyph.rightKerningGroup,
+            bottomKerningGroup=glyph.bottomKerningGroup,
+            topKerningGroup=glyph.topKerningGroup,
+            layers=layers,
+            color=glyph.color,
+            extraData=dict(extraData) if extraData is not None else None,
+        ))
+
+    return Font(
+        date=font.date,
+        familyName=font.familyName,
+        axes=[attr.evolve(axis) for axis in font.axes],
+        glyphs=glyphs,
+        masters=masters,
+        instances=[
+            attr.evolve(instance, location=dict(instance.location))
+            for instance in instances],
+        copyright=font.copyright,
+        designer=font.designer,
+        designerURL=font.designerURL,
+        manufacturer=font.manufacturer,
+        manufacturerURL=font.manufacturerURL,
+        unitsPerEm=font.unitsPerEm,
+        versionMajor=font.versionMajor,
+        versionMinor=font.versionMinor,
+    )
+
+
+def _fallback_data(glyph, master, log):
+    # the glyph's layer in *master*, looked up without adding one to the
+    # source font, or an empty layer
+    name = master.name
+    for layer in glyph._layers:
+        if layer.masterLayer and layer.masterName == name:
+            # the glyph has a default layer, so its masters are incompatible
+            if log is not None:
+                log.append(semlog.warning_incompatible_masters(name=glyph.name))
+            break
+    else:
+        layer = Layer()
+    return MasterData([layer])
+
+
+class InstanceCompiler(FamilyCompiler):
+    """
+    Compiles the instances of a font (or *instances*) to static fonts.
+
+    Instances are interpolated into the masters of an intermediate font
+    (see instance_font()) that is compiled like a family: master-independent
+    data is computed once, and instances are compiled in a pool of
+    *workers* processes if set. Results are keyed by instance style name;
+    save() writes each font as soon as it is built.
+    """
+
+    def __init__(self, font, instances=None,
+                 compilerClass=Type2FontCompiler, workers=None, **kwargs):
+        # warnings of building the instances, added to the log of each
+        self.log = []
+        font = instance_font(font, instances, log=self.log)
+        super().__init__(font, None, compilerClass, workers, **kwargs)
+        # the instance of each master, whose names apply
+        self.instances = dict(zip(
+            (master.name for master in font.masters), font.instances))
+
+    def master_compiler(self, masterName):
+        compiler = super().master_compiler(masterName)
+        compiler.ctx = ctx = self.master_context(masterName)
+        ctx.log.extend(self.log)
+        return compiler
+
+    def master_context(self, masterName):
+        return Context(
+            self.font, self.font.masterForName(masterName),
+            self.instances[masterName])
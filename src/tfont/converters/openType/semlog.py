@@ -32,6 +32,13 @@ def warning_attr_truncated(attr, result):
     )
 
 
+def warning_incompatible_masters(name):
+    return _warning(
+        text="Glyph '{name}' has incompatible masters and won't vary",
+        name=name,
+    )
+
+
 def warning_missing_hmtx(target):
     return _warning(
         text="Missing 'hmtx' table when computing '{target}'",
@@ -0,0 +1,359 @@
+from concurrent.futures import ProcessPoolExecutor
+from fontTools.misc.psCharStrings import T2CharString, calcSubrBias, \
+    encodeIntT2
+import time
+
+# hint and subroutine operators, charstrings that have them are left alone
+_skippedOperators = {1, 3, 10, 18, 19, 20, 23, 29}
+_CALLGSUBR = 29
+_ENDCHAR = 14
+_RETURN = 11
+# byte size of a subroutine call and of the overhead of a subroutine body
+# (return operator and index offset)
+_CALL_COST = 2
+_SUBR_COST = 3
+
+
+def tokenize(bytecode):
+    """
+    Splits Type 2 charstring *bytecode* into commands (operands followed
+    by their operator). Returns None if the charstring has hints or
+    subroutine calls.
+    """
+    commands = []
+    start = index = 0
+    length = len(bytecode)
+    while index < length:
+        b0 = bytecode[index]
+        if b0 >= 32:
+            if b0 <= 246:
+                index += 1
+            elif b0 <= 254:
+                index += 2
+            else:
+                index += 5
+        elif b0 == 28:
+            index += 3
+        else:
+            if b0 in _skippedOperators:
+                return None
+            index += 2 if b0 == 12 else 1
+            commands.append(bytecode[start:index])
+            start = index
+    if start != length:
+        return None
+    return commands
+
+
+def suffix_array(sequence):
+    """
+    Returns the suffix array of a sequence of non-negative ints, by prefix
+    doubling.
+    """
+    length = len(sequence)
+    order = sorted(range(length), key=sequence.__getitem__)
+    rank = [0] * length
+    for prev, index in zip(order, order[1:]):
+        rank[index] = rank[prev] + (sequence[index] != sequence[prev])
+    step = 1
+    while rank[order[-1]] < length - 1:
+        base = length + 1
+        keys = [
+            rank[index] * base + (rank[index + step] + 1 if index + step < length else 0)
+            for index in range(length)
+        ]
+        order.sort(key=keys.__getitem__)
+        rank[order[0]] = 0
+        for prev, index in zip(order, order[1:]):
+            rank[index] = rank[prev] + (keys[index] != keys[prev])
+        step *= 2
+    return order
+
+
+def lcp_array(sequence, order):
+    """
+    Returns the lengths of the common prefixes of consecutive suffixes in
+    *order* (Kasai's algorithm).
+    """
+    length = len(sequence)
+    rank = [0] * length
+    for position, index in enumerate(order):
+        rank[index] = position
+    lcp = [0] * length
+    common = 0
+    for index in range(length):
+        position = rank[index]
+        if position:
+            other = order[position - 1]
+            while index + common < length and other + common < length and \
+                    sequence[index + common] == sequence[other + common]:
+                common += 1
+            lcp[position] = common
+            if common:
+                common -= 1
+        else:
+            common = 0
+    return lcp
+
+
+def find_candidates(sequences, costs):
+    """
+    Returns a {token tuple: count} dict of the fragments repeated across
+    *sequences*, worth putting in a subroutine. Runs in worker processes.
+    """
+    # glyph boundaries get unique tokens, so that no fragment crosses them
+    separator = len(costs)
+    concatenated = []
+    for sequence in sequences:
+        concatenated.extend(sequence)
+        concatenated.append(separator)
+        separator += 1
+    if not concatenated:
+        return {}
+    order = suffix_array(concatenated)
+    lcp = lcp_array(concatenated, order)
+
+    # walk the lcp intervals, each is a fragment repeated (right - left + 1)
+    # times
+    candidates = {}
+    stack = [(0, 0)]
+    for position in range(1, len(order) + 1):
+        common = lcp[position] if position < len(order) else 0
+        left = position - 1
+        while common < stack[-1][0]:
+            length, left = stack.pop()
+            count = position - left
+            start = order[left]
+            fragment = tuple(concatenated[start:start + length])
+            size = sum(costs[token] for token in fragment)
+            if count * (size - _CALL_COST) > size + _SUBR_COST:
+                candidates[fragment] = max(candidates.get(fragment, 0), count)
+        if common > stack[-1][0]:
+            stack.append((common, left))
+    return candidates
+
+
+def parse_sequences(sequences, costs, candidates, deadline):
+    """
+    Finds the cheapest encoding of each of *sequences* given the candidate
+    subroutines, by dynamic programming. Returns lists of tokens where a
+    subroutine call is stored as ~index into *candidates*, or None for the
+    sequences not handled before *deadline*. Runs in worker processes.
+    """
+    byFirst = {}
+    for index, fragment in enumerate(candidates):
+        byFirst.setdefault(fragment[0], []).append((len(fragment), fragment, index))
+    parses = []
+    for sequence in sequences:
+        if deadline is not None and time.time() > deadline:
+            parses.append(None)
+            continue
+        length = len(sequence)
+        best = [0] * (length + 1)
+        choice = [None] * length
+        for position in range(length - 1, -1, -1):
+            token = sequence[position]
+            cost = best[position + 1] + costs[token]
+            chosen = None
+            for size, fragment, index in byFirst.get(token, ()):
+                end = position + size
+                if end <= length and best[end] + _CALL_COST < cost and \
+                        tuple(sequence[position:end]) == fragment:
+                    cost = best[end] + _CALL_COST
+                    chosen = (size, index)
+            best[position] = cost
+            choice[position] = chosen
+        parse = []
+        position = 0
+        while position < length:
+            chosen = choice[position]
+            if chosen is None:
+                parse.append(sequence[position])
+                position += 1
+            else:
+                size, index = chosen
+                parse.append(~index)
+                position += size
+        parses.append(parse)
+    return parses
+
+
+class Subroutinizer:
+    """
+    Moves charstring fragments that repeat across glyphs into global
+    subroutines.
+
+    Charstrings are split into commands, and repeated command sequences
+    are found with a suffix array. Each glyph is then encoded with the
+    subroutines that make it the smallest; subroutines that don't pay for
+    themselves are inlined back. Subroutines are not nested.
+
+    *memoryLimit* (in bytes) bounds the size of each suffix array: larger
+    fonts are indexed in glyph batches, fragments repeated only across
+    batches are missed. After *timeLimit* seconds, the remaining glyphs
+    are left unsubroutinized. Batches are processed in a pool of *workers*
+    processes, if set.
+    """
+    __slots__ = "_memoryLimit", "_timeLimit", "_workers"
+
+    # rough memory used per indexed command
+    bytesPerToken = 256
+
+    def __init__(self, timeLimit=None, memoryLimit=256 << 20, workers=None):
+        self._timeLimit = timeLimit
+        self._memoryLimit = memoryLimit
+        self._workers = workers
+
+    def __repr__(self):
+        return "%s(timeLimit=%r, memoryLimit=%r, workers=%r)" % (
+            self.__class__.__name__, self._timeLimit, self._memoryLimit,
+            self._workers)
+
+    @property
+    def memoryLimit(self):
+        return self._memoryLimit
+
+    @property
+    def timeLimit(self):
+        return self._timeLimit
+
+    @property
+    def workers(self):
+        return self._workers
+
+    def subroutinize(self, charStrings, globalSubrs, private):
+        """
+        Subroutinizes the T2CharStrings in *charStrings* (a list) in place,
+        storing subroutines in the empty *globalSubrs* index.
+        """
+        deadline = None
+        if self._timeLimit is not None:
+            deadline = time.time() + self._timeLimit
+
+        # intern commands, each glyph becomes a sequence of ints. the first
+        # command holds the width and the last is endchar, they stay out
+        tokens = {}
+        commands = []
+        sequences = []
+        indices = []
+        for index, charString in enumerate(charStrings):
+            charString.compile()
+            glyphCommands = tokenize(charString.bytecode)
+            if glyphCommands is None or len(glyphCommands) < 3 or \
+                    glyphCommands[-1][-1] != _ENDCHAR:
+                continue
+            sequence = []
+            for command in glyphCommands[1:-1]:
+                token = tokens.get(command)
+                if token is None:
+                    token = tokens[command] = len(commands)
+                    commands.append(command)
+                sequence.append(token)
+            sequences.append(sequence)
+            indices.append(index)
+        if not sequences:
+            return
+        costs = [len(command) for command in commands]
+
+        batches = self._batches(sequences)
+        candidates = {}
+        for batchCandidates in self._map(
+                find_candidates, batches, [costs] * len(batches)):
+            for fragment, count in batchCandidates.items():
+                candidates[fragment] = candidates.get(fragment, 0) + count
+            if deadline is not None and time.time() > deadline:
+                break
+        if not candidates:
+            return
+        # best estimated savings first
+        fragments = sorted(
+            candidates, key=lambda fragment: -candidates[fragment] * (
+                sum(costs[token] for token in fragment) - _CALL_COST))
+        del fragments[65535:]
+
+        # parse with the candidates, then again with those that paid off
+        for attempt in range(2):
+            parses = []
+            for batchParses in self._map(
+                    parse_sequences, batches, [costs] * len(batches),
+                    [fragments] * len(batches), [deadline] * len(batches)):
+                parses.extend(batchParses)
+
+            # keep the subroutines that pay for themselves
+            usage = [0] * len(fragments)
+            for parse in parses:
+                if parse is not None:
+                    for token in parse:
+                        if token < 0:
+                            usage[~token] += 1
+            kept = []
+            for index, fragment in enumerate(fragments):
+                count = usage[index]
+                size = sum(costs[token] for token in fragment)
+                if count > 1 and count * (size - _CALL_COST) > size + _SUBR_COST:
+                    kept.append(index)
+            if len(kept) == len(fragments) or attempt:
+                break
+            fragments = [fragments[index] for index in kept]
+            if not fragments:
+                return
+        if not kept:
+            return
+        # most used first, so that they get the shortest calls
+        kept.sort(key=lambda index: -usage[index])
+        bias = calcSubrBias(kept)
+        calls = {}
+        for subrIndex, index in enumerate(kept):
+            calls[index] = encodeIntT2(subrIndex - bias) + bytes((_CALLGSUBR,))
+            bytecode = b"".join(commands[token] for token in fragments[index])
+            globalSubrs.append(T2CharString(
+                bytecode=bytecode + bytes((_RETURN,)),
+                private=private, globalSubrs=globalSubrs))
+
+        for index, parse in zip(indices, parses):
+            if parse is None:
+                continue
+            charString = charStrings[index]
+            glyphCommands = tokenize(charString.bytecode)
+            body = []
+            for token in parse:
+                if token >= 0:
+                    body.append(commands[token])
+                elif ~token in calls:
+                    body.append(calls[~token])
+                else:
+                    body.extend(commands[t] for t in fragments[~token])
+            charStrings[index] = T2CharString(
+                bytecode=b"".join([glyphCommands[0]] + body + [glyphCommands[-1]]),
+                private=private, globalSubrs=globalSubrs)
+
+    #
+
+    def _batches(self, sequences):
+        maxTokens = max(self._memoryLimit // self.bytesPerToken, 1)
+        total = sum(len(sequence) for sequence in sequences)
+        count = -(-total // maxTokens)
+        workers = self._workers
+        if workers is not None and workers > 1:
+            count = max(count, workers)
+        size = -(-total // count)
+        batches = []
+        batch = []
+        batchSize = 0
+        for sequence in sequences:
+            batch.append(sequence)
+            batchSize += len(sequence)
+            if batchSize >= size:
+                batches.append(batch)
+                batch = []
+                batchSize = 0
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _map(self, function, *iterables):
+        workers = self._workers
+        if workers is None or workers <= 1 or len(iterables[0]) <= 1:
+            return map(function, *iterables)
+        with ProcessPoolExecutor(workers) as executor:
+            return list(executor.map(function, *iterables))
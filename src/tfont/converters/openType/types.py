@@ -1,13 +1,18 @@
 
 
 class Context:
-    __slots__ = ("_font", "_master", "_log")
+    __slots__ = ("_font", "_master", "_instance", "_log")
 
-    def __init__(self, font, master):
+    def __init__(self, font, master, instance=None):
         self._font = font
         self._master = master
+        self._instance = instance
         self._log = []
 
+    @property
+    def instance(self):
+        return self._instance
+
     @property
     def log(self):
         return self._log
@@ -0,0 +1,336 @@
+from collections import ChainMap
+from fontTools import ttLib
+from fontTools.misc.fixedTools import otRound
+from fontTools.otlLib.builder import buildStatTable
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.ttLib.tables.TupleVariation import TupleVariation
+from fontTools.ttLib.tables._f_v_a_r import Axis, NamedInstance
+from fontTools.varLib.models import VariationModel, normalizeLocation
+from tfont.converters.openType import drawing, semlog
+from tfont.converters.openType.compiler import TrueTypeFontCompiler
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def convert_to_compatible_quadratic(glyphs, maxErr):
+    """
+    Converts a batch of glyphs, each a list of the flattened outlines of its
+    masters, to quadratic splines with the same structure in all masters.
+    Glyphs whose masters are incompatible get None. Runs in worker
+    processes, see TrueTypeFontCompiler.workers.
+    """
+    results = []
+    for masterContours in glyphs:
+        try:
+            results.append(drawing.compatible_quadratic_contours(
+                masterContours, maxErr))
+        except ValueError:
+            results.append(None)
+    return results
+
+
+def glyph_points(ttGlyph, width):
+    """
+    Returns the point coordinates of compiled glyph *ttGlyph* as gvar sees
+    them, flattened and with phantom points for *width*, and the controls
+    that must match across masters for the glyph to vary.
+    """
+    numberOfContours = ttGlyph.numberOfContours
+    if ttGlyph.isComposite():
+        coordinates = []
+        components = []
+        for component in ttGlyph.components:
+            coordinates.append(component.x)
+            coordinates.append(component.y)
+            transform = getattr(component, "transform", None)
+            if transform is not None:
+                transform = tuple(map(tuple, transform))
+            components.append((component.glyphName, transform))
+        controls = (
+            numberOfContours, list(range(len(components))), components)
+    elif numberOfContours:
+        coordinates = list(map(otRound, ttGlyph.coordinates.array))
+        controls = (
+            numberOfContours, list(ttGlyph.endPtsOfContours),
+            bytes(flags & 1 for flags in ttGlyph.flags))
+    else:
+        coordinates = []
+        controls = (0, [], None)
+    # left, right, top and bottom phantom points. glyphs are positioned so
+    # that the left sidebearing is xMin
+    coordinates.extend((0, 0, width, 0, 0, 0, 0, 0))
+    return coordinates, controls
+
+
+def master_deltas(model, masterCoordinates):
+    """
+    Returns the deltas of *model* for the flat coordinates of each of its
+    masters, computed over all points at once with numpy if available.
+    """
+    deltas = []
+    if numpy is not None:
+        masterValues = numpy.array(masterCoordinates, numpy.float64)
+        for index, weights in enumerate(model.deltaWeights):
+            delta = masterValues[model.reverseMapping[index]]
+            for other, weight in weights.items():
+                delta = delta - deltas[other] * weight
+            deltas.append(numpy.floor(delta + .5))
+        return [delta.astype(numpy.int64).tolist() for delta in deltas]
+    for index, weights in enumerate(model.deltaWeights):
+        delta = masterCoordinates[model.reverseMapping[index]]
+        for other, weight in weights.items():
+            delta = [
+                value - otherValue * weight
+                for value, otherValue in zip(delta, deltas[other])]
+        deltas.append(list(map(otRound, delta)))
+    return deltas
+
+
+class VariableFontCompiler(TrueTypeFontCompiler):
+    """
+    Compiles all masters of a font to a TrueType variable font. The master
+    at the default location of the axes makes the glyf outlines, the others
+    become gvar deltas, and fvar and STAT describe the axes and instances.
+
+    Curves are converted to quadratic splines jointly across masters, so
+    that they stay compatible. A glyph that has no layer in a master is
+    interpolated from the others (sparse masters); a glyph whose masters
+    are incompatible doesn't vary, with a warning in the log.
+
+    Deltas are IUP-optimized if *optimizeGvar* is true, which makes gvar
+    smaller but takes longer.
+    """
+
+    def __init__(self, font, maxErr=None, reverseDirection=True,
+                 workers=None, optimizeGvar=True):
+        axes = list(font.axes)
+        if not axes:
+            raise ValueError("font has no axes")
+        masters = list(font.masters)
+        locations = [self.full_location(axes, master.location)
+                     for master in masters]
+        try:
+            index = locations.index(
+                {axis.tag: axis.default for axis in axes})
+        except ValueError:
+            raise ValueError("no master is at the default location of the axes")
+        masters.insert(0, masters.pop(index))
+        locations.insert(0, locations.pop(index))
+        super().__init__(font, masters[0].name, maxErr, reverseDirection,
+                         workers)
+        # the default master comes first
+        self.masters = masters
+        axisLimits = {
+            axis.tag: (axis.min, axis.default, axis.max) for axis in axes}
+        self.model = VariationModel(
+            [normalizeLocation(location, axisLimits) for location in locations],
+            axisOrder=[axis.tag for axis in axes])
+        self.optimizeGvar = optimizeGvar
+
+    @staticmethod
+    def full_location(axes, location):
+        return {axis.tag: location.get(axis.tag, axis.default) for axis in axes}
+
+    def build_requirements(self):
+        # outlines and gvar points of the masters after the default
+        self.masterGlyphSets = [{} for _ in self.masters[1:]]
+        self.masterPoints = {}
+        super().build_requirements()
+
+    def build_fvar(self):
+        font = self.ctx.font
+        axes = list(font.axes)
+        name = self.otf["name"]
+        self.otf["fvar"] = fvar = ttLib.newTable("fvar")
+
+        for axis in axes:
+            fvarAxis = Axis()
+            fvarAxis.axisTag = axis.tag
+            fvarAxis.minValue = axis.min
+            fvarAxis.defaultValue = axis.default
+            fvarAxis.maxValue = axis.max
+            fvarAxis.axisNameID = self.add_name(name, axis.name or axis.tag)
+            fvar.axes.append(fvarAxis)
+
+        for instance in font.instances:
+            namedInstance = NamedInstance()
+            namedInstance.subfamilyNameID = self.add_name(
+                name, instance.styleName)
+            if instance.postscriptFontName:
+                namedInstance.postscriptNameID = self.add_name(
+                    name, instance.postscriptFontName)
+            namedInstance.coordinates = self.full_location(
+                axes, instance.location)
+            fvar.instances.append(namedInstance)
+
+    def build_gvar(self):
+        self.otf["gvar"] = gvar = ttLib.newTable("gvar")
+        gvar.version = 1
+        gvar.reserved = 0
+        gvar.variations = self.glyph_variations(self.glyphOrder)
+
+    def build_others(self):
+        super().build_others()
+        self.build_fvar()
+        self.build_STAT()
+        self.build_gvar()
+
+    def build_STAT(self):
+        buildStatTable(self.otf, [
+            {"tag": axis.tag, "name": axis.name or axis.tag}
+            for axis in self.ctx.font.axes
+        ], macNames=False)
+
+    def keep_outlines(self, glyphNames):
+        # axes and master locations are font info too, the variations are
+        # rebuilt from scratch
+        pass
+
+    def update_outlines(self, glyphNames):
+        super().update_outlines(glyphNames)
+
+        ctx = self.ctx
+        data = self.metadataProvider
+        glyphMap = self.glyphMap
+        glyphSet = self.glyphSet
+        glyphs = self.glyfTable.glyphs
+        masterPoints = self.masterPoints
+        for glyphName in glyphNames:
+            glyph = glyphMap[glyphName]
+            ttGlyph = glyphs[glyphName]
+            points = [glyph_points(
+                ttGlyph, otRound(data.glyph_width(ctx, glyph)))]
+            for master, masterGlyphSet in zip(
+                    self.masters[1:], self.masterGlyphSets):
+                flattenedGlyph = masterGlyphSet.get(glyphName)
+                if flattenedGlyph is None:
+                    points.append(None)
+                    continue
+                pen = TTGlyphPen(ChainMap(masterGlyphSet, glyphSet))
+                flattenedGlyph.draw(pen)
+                masterGlyph = pen.glyph()
+                # an empty layer in a master is taken as a missing one
+                if ttGlyph.numberOfContours and not masterGlyph.numberOfContours:
+                    points.append(None)
+                    continue
+                width = otRound(data.layer_width(
+                    ctx, self.master_layer(glyph, master)))
+                points.append(glyph_points(masterGlyph, width))
+            controls = points[0][1]
+            if any(masterPoints_ is not None and masterPoints_[1] != controls
+                   for masterPoints_ in points[1:]):
+                ctx.log.append(
+                    semlog.warning_incompatible_masters(name=glyphName))
+                points[1:] = [None] * (len(points) - 1)
+            masterPoints[glyphName] = points
+
+    def update_others(self, glyphNames):
+        self.otf["gvar"].variations.update(self.glyph_variations(glyphNames))
+
+    #
+
+    def add_name(self, name, string):
+        return name.addMultilingualName(
+            {"en": string}, mac=False, minNameID=255)
+
+    def convert_glyphs(self, glyphNames):
+        ctx = self.ctx
+        data = self.metadataProvider
+        glyphMap = self.glyphMap
+        masters = self.masters
+        reverse = self.reverseDirection
+
+        masterLayers = []
+        for glyphName in glyphNames:
+            glyph = glyphMap[glyphName]
+            layers = [data.glyph_layer(ctx, glyph)]
+            layers.extend(
+                self.master_layer(glyph, master) for master in masters[1:])
+            masterLayers.append(layers)
+        results = self.convert_outlines([
+            [drawing.flatten_paths(layer) for layer in layers
+             if layer is not None]
+            for layers in masterLayers
+        ], convert_to_compatible_quadratic)
+
+        glyphSets = [self.glyphSet] + self.masterGlyphSets
+        for glyphName, layers, quadraticContours in zip(
+                glyphNames, masterLayers, results):
+            if quadraticContours is None:
+                ctx.log.append(
+                    semlog.warning_incompatible_masters(name=glyphName))
+                quadraticContours = [drawing.quadratic_contours(
+                    drawing.flatten_paths(layers[0]), self.maxErr)]
+                layers[1:] = [None] * (len(layers) - 1)
+            quadraticContours = iter(quadraticContours)
+            for glyphSet, layer in zip(glyphSets, layers):
+                if layer is None:
+                    glyphSet.pop(glyphName, None)
+                else:
+                    glyphSet[glyphName] = drawing.FlattenedGlyph(
+                        next(quadraticContours),
+                        drawing.layer_components(layer),
+                        reverse
+                    )
+
+    def glyph_variations(self, glyphNames):
+        """
+        Returns a {glyphName: [TupleVariation]} dict for *glyphNames*.
+
+        Glyphs are grouped by the masters they have, and the deltas of each
+        group are computed at once over the points of all its glyphs.
+        """
+        masterPoints = self.masterPoints
+        groups = {}
+        for glyphName in glyphNames:
+            present = tuple(
+                points is not None for points in masterPoints[glyphName])
+            groups.setdefault(present, []).append(glyphName)
+
+        variations = {}
+        for present, groupNames in groups.items():
+            if not any(present[1:]):
+                for glyphName in groupNames:
+                    variations[glyphName] = []
+                continue
+            model, _ = self.model.getSubModel(
+                [True if flag else None for flag in present])
+            masterCoordinates = [[] for flag in present if flag]
+            for glyphName in groupNames:
+                allPoints = [
+                    points for points in masterPoints[glyphName]
+                    if points is not None]
+                for coordinates, (points, _) in zip(
+                        masterCoordinates, allPoints):
+                    coordinates.extend(points)
+            deltas = master_deltas(model, masterCoordinates)
+
+            start = 0
+            for glyphName in groupNames:
+                coordinates, controls = masterPoints[glyphName][0]
+                end = start + len(coordinates)
+                origCoords = list(zip(coordinates[0::2], coordinates[1::2]))
+                glyphVariations = variations[glyphName] = []
+                for delta, support in zip(deltas[1:], model.supports[1:]):
+                    glyphDelta = delta[start:end]
+                    if not any(glyphDelta):
+                        continue
+                    variation = TupleVariation(
+                        support, list(zip(glyphDelta[0::2], glyphDelta[1::2])))
+                    if self.optimizeGvar:
+                        variation.optimize(origCoords, controls[1])
+                    glyphVariations.append(variation)
+                start = end
+        return variations
+
+    def master_layer(self, glyph, master):
+        """
+        Returns the layer of *glyph* for *master*, or None if it has none.
+        """
+        name = master.name
+        for layer in glyph._layers:
+            if layer.masterLayer and layer.masterName == name:
+                return layer
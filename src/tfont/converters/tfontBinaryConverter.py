@@ -0,0 +1,429 @@
+from array import array
+import mmap
+import rapidjson as json
+import struct
+import sys
+from tfont.converters.tfontConverter import LazyGlyphList, TFontConverter, \
+    _GlyphData
+from tfont.objects.compactPath import CompactPath, INT_X, INT_Y, SMOOTH, \
+    number_flags, point_flags, point_type
+from tfont.objects.font import Font
+from tfont.objects.glyph import Glyph
+from tfont.objects.path import Path
+from tfont.objects.point import Point
+from tfont.util.observable import in_batch_update
+
+# magic, container version, reserved, font data offset, table of contents
+# offset. the header size keeps the chunks that follow 8-byte aligned
+_header = struct.Struct("<4sHHQQ")
+_magic = b"TFNB"
+# path count and JSON size of a glyph chunk
+_glyphHeader = struct.Struct("<II")
+
+# point flags in packed paths are those of CompactPath, which tell whether
+# coordinates are integers so that they read back as they were.
+# flags -> Point type and smooth, filled for valid flags
+_pointAttributes = {}
+for _flags in range(256):
+    try:
+        _pointAttributes[_flags] = point_type(_flags), bool(_flags & SMOOTH)
+    except IndexError:
+        pass
+
+_bigEndian = sys.byteorder == "big"
+
+
+class PackedPath:
+    """
+    The points of a path as stored in binary fonts: interleaved x, y
+    coordinates in an array('d') and a flags byte per point, with point
+    extraData kept sparsely by index.
+
+    Paths decoded without copy have memoryviews over the file data
+    instead, numpy.asarray() views their coordinates without copying.
+    """
+    __slots__ = "coordinates", "flags", "pointsExtraData", "extraData"
+
+    def __init__(self, coordinates, flags, pointsExtraData=None,
+                 extraData=None):
+        self.coordinates = coordinates
+        self.flags = flags
+        self.pointsExtraData = pointsExtraData
+        self.extraData = extraData
+
+    def __len__(self):
+        return len(self.flags)
+
+
+def encode_glyph(data):
+    """
+    Returns the bytes of unstructured glyph *data*, whose paths are
+    PackedPath objects.
+
+    The points of all paths are stored in a single run: the glyph header
+    and the point count of each path are followed by the coordinates of
+    all points as float64 (8-byte aligned from the start of the glyph), and
+    their flags. The rest of the glyph is stored as JSON, with paths
+    replaced by their index and the extraData of paths and points after
+    it. Everything is little-endian.
+    """
+    paths = []
+    for layer in data.get("layers", ()):
+        layerPaths = layer.get("paths")
+        if layerPaths:
+            for index, path in enumerate(layerPaths):
+                layerPaths[index] = len(paths)
+                paths.append(path)
+    counts = array("I")
+    coordinates = array("d")
+    flags = bytearray()
+    extraData = {}
+    for index, path in enumerate(paths):
+        counts.append(len(path.flags))
+        coordinates.extend(path.coordinates)
+        flags += path.flags
+        if path.pointsExtraData or path.extraData:
+            pointsExtraData = path.pointsExtraData
+            if pointsExtraData:
+                pointsExtraData = {
+                    str(pointIndex): value
+                    for pointIndex, value in pointsExtraData.items()}
+            extraData[str(index)] = pointsExtraData, path.extraData
+    text = json.dumps((data, extraData or None)).encode("utf-8")
+    if _bigEndian:
+        counts.byteswap()
+        coordinates.byteswap()
+
+    out = bytearray(_glyphHeader.pack(len(paths), len(text)))
+    out += counts.tobytes()
+    out += bytes(-len(out) % 8)
+    out += coordinates.tobytes()
+    out += flags
+    out += text
+    return bytes(out)
+
+
+def decode_glyph(data, index=0, copy=True):
+    """
+    Returns the unstructured glyph encoded in *data* (a bytes-like object)
+    at *index*, see encode_glyph().
+
+    If *copy* is false, path coordinates and flags are memoryviews over
+    *data* (except on big-endian machines, where they must be swapped).
+    """
+    pathCount, textLength = _glyphHeader.unpack_from(data, index)
+    index += _glyphHeader.size
+    counts = array("I")
+    counts.frombytes(data[index:index + 4 * pathCount])
+    if _bigEndian:
+        counts.byteswap()
+    index += 4 * pathCount
+    index += -index % 8
+    length = sum(counts)
+    end = index + 16 * length
+    if copy or _bigEndian:
+        coordinates = array("d")
+        coordinates.frombytes(data[index:end])
+        if _bigEndian:
+            coordinates.byteswap()
+        flags = bytes(data[end:end + length])
+    else:
+        view = memoryview(data)
+        coordinates = view[index:end].cast("d")
+        flags = view[end:end + length]
+    index = end + length
+    glyph, extraData = json.loads(bytes(data[index:index + textLength]))
+
+    paths = []
+    start = 0
+    for count in counts:
+        end = start + count
+        paths.append(PackedPath(
+            coordinates[2 * start:2 * end], flags[start:end]))
+        start = end
+    if extraData:
+        for pathIndex, (pointsExtraData, pathExtraData) in extraData.items():
+            path = paths[int(pathIndex)]
+            if pointsExtraData:
+                path.pointsExtraData = {
+                    int(pointIndex): value
+                    for pointIndex, value in pointsExtraData.items()}
+            path.extraData = pathExtraData
+    for layer in glyph.get("layers", ()):
+        layerPaths = layer.get("paths")
+        if layerPaths:
+            layer["paths"] = [paths[pathIndex] for pathIndex in layerPaths]
+    return glyph
+
+
+def _pack_Path(path):
+    coordinates = array("d")
+    flags = bytearray()
+    pointsExtraData = None
+    for index, point in enumerate(path._points):
+        x, y = point._x, point._y
+        coordinates.append(x)
+        coordinates.append(y)
+        flags.append(
+            point_flags(point._type, point._smooth) | number_flags(x, y))
+        extraData = point._extraData
+        if extraData:
+            if pointsExtraData is None:
+                pointsExtraData = {}
+            pointsExtraData[index] = extraData
+    return PackedPath(
+        coordinates, flags, pointsExtraData, path._extraData or None)
+
+
+def _pack_CompactPath(path):
+    coordinates = path._coordinates
+    flags = path._flags
+    pointsExtraData = path._pointsExtraData
+    if pointsExtraData:
+        pointsExtraData = {
+            index: extraData for index, extraData in pointsExtraData.items()
+            if extraData}
+    return PackedPath(
+        coordinates, flags, pointsExtraData or None, path._extraData or None)
+
+
+def _unpack_Path(data, cls):
+    coordinates = data.coordinates
+    pointsExtraData = data.pointsExtraData or {}
+    points = []
+    for index, flags in enumerate(data.flags):
+        x, y = coordinates[2 * index], coordinates[2 * index + 1]
+        if flags & INT_X:
+            x = int(x)
+        if flags & INT_Y:
+            y = int(y)
+        point = Point(x, y, *_pointAttributes[flags])
+        if pointsExtraData:
+            point._extraData = pointsExtraData.get(index)
+        points.append(point)
+    path = cls(points)
+    path._extraData = data.extraData
+    return path
+
+
+def _unpack_CompactPath(data, cls):
+    return CompactPath(
+        data.coordinates,
+        bytearray(data.flags),
+        data.pointsExtraData,
+        data.extraData,
+    )
+
+
+class TFontBinaryConverter(TFontConverter):
+    """
+    Converts Font objects from/to a binary encoding of the .tfont format,
+    faster to read and write than JSON. It holds the same data: fonts
+    convert losslessly between the two formats, by opening with one
+    converter and saving with the other.
+
+    The file has a header, the glyphs (see encode_glyph()), the font data
+    without glyphs as JSON and a table of contents, a JSON list of the
+    offset, size, name and unicodes of each glyph.
+
+    With *lazy* set, glyphs are kept encoded and decoded when first
+    accessed; iterGlyphs() reads them from the file one at a time.
+    """
+    __slots__ = ()
+
+    binaryVersion = 0
+
+    def __init__(self, compactPaths=False, lazy=False, **kwargs):
+        super().__init__(None, compactPaths, lazy, **kwargs)
+
+        if compactPaths:
+            self.register_structure_hook(Path, _unpack_CompactPath)
+        else:
+            self.register_structure_hook(Path, _unpack_Path)
+        self.register_unstructure_hook(Path, _pack_Path)
+        self.register_unstructure_hook(CompactPath, _pack_CompactPath)
+
+    def iterGlyphs(self, path):
+        with open(path, "rb") as file:
+            _, tocOffset = self._read_header(file.read(_header.size))
+            file.seek(tocOffset)
+            toc = json.loads(file.read())
+            for offset, length, _, _ in toc:
+                file.seek(offset)
+                yield self.structure(decode_glyph(file.read(length)), Glyph)
+
+    def open(self, path, font=None):
+        with open(path, "rb") as file:
+            data = file.read()
+        fontOffset, tocOffset = self._read_header(data)
+        d = json.loads(data[fontOffset:tocOffset])
+        # XXX: default to 0 for now because Fonte doesn't add this attr
+        assert self.version >= d.pop(".formatVersion", 0)
+        toc = json.loads(data[tocOffset:])
+
+        if self._lazy:
+            glyphs = [
+                _GlyphData(name, unicodes, data[offset:offset + length])
+                for offset, length, name, unicodes in toc]
+        elif toc:
+            d["glyphs"] = [
+                decode_glyph(data, offset) for offset, _, _, _ in toc]
+        if font is not None:
+            self._font = font
+        font = self.structure(d, Font)
+        if self._lazy and toc:
+            font._glyphs = LazyGlyphList(glyphs, self, font)
+        elif toc:
+            # glyphs are written back as they were read until they change
+            fragments = self._fragments
+            for glyph, (offset, length, _, _) in zip(font._glyphs, toc):
+                fragments[glyph] = \
+                    glyph._changeCount, data[offset:offset + length]
+        return font
+
+    def save(self, font, path):
+        toc = []
+        with open(path, "wb") as file:
+            offset = _header.size
+            file.write(bytes(offset))
+            # glyphs are written as they are encoded
+            for glyph in self._iter_glyphs(font._glyphs):
+                if glyph.__class__ is _GlyphData:
+                    data = glyph.data
+                    unicodes = glyph.unicodes
+                else:
+                    data = self._glyph_bytes(glyph)
+                    unicodes = glyph._unicodes
+                toc.append((offset, len(data), glyph.name, unicodes))
+                offset += self._write_chunk(file, data)
+            fontOffset = offset
+            offset += self._write_chunk(file, json.dumps(
+                self.unstructure_attrs_asdict(font, skip=("_glyphs",))
+            ).encode("utf-8"))
+            file.write(json.dumps(toc).encode("utf-8"))
+            file.seek(0)
+            file.write(_header.pack(
+                _magic, self.binaryVersion, 0, fontOffset, offset))
+        return True, []
+
+    #
+
+    def _glyph_bytes(self, glyph):
+        changeCount = glyph._changeCount
+        fragment = self._fragments.get(glyph)
+        # change events are deferred during a batch update
+        if fragment is not None and fragment[0] == changeCount and \
+                not in_batch_update():
+            return fragment[1]
+        data = encode_glyph(self.unstructure_attrs_asdict(glyph))
+        self._fragments[glyph] = changeCount, data
+        return data
+
+    def _read_header(self, data):
+        if len(data) < _header.size:
+            raise ValueError("not a binary tfont file")
+        magic, version, _, fontOffset, tocOffset = _header.unpack_from(data)
+        if magic != _magic:
+            raise ValueError("not a binary tfont file")
+        if version > self.binaryVersion:
+            raise ValueError(f"unsupported binary tfont version {version}")
+        return fontOffset, tocOffset
+
+    def _structure_glyph_data(self, glyphData):
+        glyph = self.structure(decode_glyph(glyphData.data), Glyph)
+        self._fragments[glyph] = glyph._changeCount, glyphData.data
+        return glyph
+
+    @staticmethod
+    def _write_chunk(file, data):
+        # chunks are padded with spaces to keep the next one aligned, that
+        # is whitespace at the end of the font data JSON
+        padding = -len(data) % 8
+        file.write(data)
+        file.write(b" " * padding)
+        return len(data) + padding
+
+
+class MappedFont:
+    """
+    Read-only access to the glyphs of a binary .tfont file mapped in
+    memory, for consumers that only draw or measure glyphs.
+
+    glyphDataForName() returns glyphs unstructured, with paths whose
+    coordinates and flags are views over the mapping (see PackedPath): no
+    Point objects are made and processes that map the same file share its
+    pages. glyphForName() structures a glyph, copying its data. The font
+    data without glyphs is in the font attribute.
+
+    The file must not be rewritten in place while it is mapped, and views
+    must be released before close().
+    """
+    __slots__ = "_converter", "_font", "_indices", "_mmap", "_toc"
+
+    def __init__(self, path, compactPaths=False):
+        self._converter = converter = TFontBinaryConverter(compactPaths)
+        with open(path, "rb") as file:
+            self._mmap = data = mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ)
+        fontOffset, tocOffset = converter._read_header(data)
+        d = json.loads(data[fontOffset:tocOffset])
+        # XXX: default to 0 for now because Fonte doesn't add this attr
+        assert converter.version >= d.pop(".formatVersion", 0)
+        self._font = converter.structure(d, Font)
+        self._toc = toc = json.loads(data[tocOffset:])
+        self._indices = {entry[2]: index for index, entry in enumerate(toc)}
+
+    def __contains__(self, name):
+        return name in self._indices
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __iter__(self):
+        for entry in self._toc:
+            yield entry[2]
+
+    def __len__(self):
+        return len(self._toc)
+
+    def __repr__(self):
+        return "%s(%r, %d glyphs)" % (
+            self.__class__.__name__, self._font.familyName, len(self._toc))
+
+    @property
+    def font(self):
+        return self._font
+
+    @property
+    def glyphNames(self):
+        return [entry[2] for entry in self._toc]
+
+    def close(self):
+        self._mmap.close()
+
+    def glyphDataForName(self, name):
+        """
+        Returns the unstructured data of glyph *name*, with its paths as
+        PackedPath views over the file, or None if there is no such glyph.
+        """
+        index = self._indices.get(name)
+        if index is None:
+            return None
+        return decode_glyph(self._mmap, self._toc[index][0], copy=False)
+
+    def glyphForName(self, name):
+        index = self._indices.get(name)
+        if index is None:
+            return None
+        converter = self._converter
+        return converter.structure(
+            decode_glyph(self._mmap, self._toc[index][0]), Glyph)
+
+    def unicodesForName(self, name):
+        index = self._indices.get(name)
+        if index is None:
+            return None
+        return self._toc[index][3]
@@ -1,14 +1,23 @@
+from array import array
 import cattr
 from collections.abc import Collection
 from datetime import datetime
+from json import JSONDecoder
+from json.decoder import scanstring
 import rapidjson as json
 from rapidjson import RawJSON
+import re
+from tfont.objects.compactPath import CompactPath, INT_X, INT_Y, SMOOTH, \
+    number_flags, point_flags, point_type
 from tfont.objects.font import Font
+from tfont.objects.glyph import Glyph
 from tfont.objects.layer import Layer
 from tfont.objects.misc import AlignmentZone, Matrix3x2
 from tfont.objects.path import Path
 from tfont.objects.point import Point
+from tfont.util.observable import in_batch_update
 from typing import Union
+from weakref import WeakKeyDictionary
 
 
 def _structure_Path(data, cls):
@@ -34,14 +43,14 @@ def _structure_Path(data, cls):
 def _unstructure_Path(path):
     data = []
     for point in path._points:
-        ptType = point.type
+        ptType = point._type
         if ptType is not None:
-            if point.smooth:
-                value = (point.x, point.y, ptType, True)
+            if point._smooth:
+                value = (point._x, point._y, ptType, True)
             else:
-                value = (point.x, point.y, ptType)
+                value = (point._x, point._y, ptType)
         else:
-            value = (point.x, point.y)
+            value = (point._x, point._y)
         extraData = point._extraData
         if extraData:
             value += (extraData,)
@@ -54,14 +63,14 @@ def _unstructure_Path(path):
 def _unstructure_Path_base(path):
     data = []
     for point in path._points:
-        ptType = point.type
+        ptType = point._type
         if ptType is not None:
-            if point.smooth:
-                value = (point.x, point.y, ptType, True)
+            if point._smooth:
+                value = (point._x, point._y, ptType, True)
             else:
-                value = (point.x, point.y, ptType)
+                value = (point._x, point._y, ptType)
         else:
-            value = (point.x, point.y)
+            value = (point._x, point._y)
         extraData = point._extraData
         if extraData:
             value += (extraData,)
@@ -71,14 +80,364 @@ def _unstructure_Path_base(path):
     return data
 
 
+def _structure_CompactPath(data, cls):
+    coordinates = array("d")
+    flags = bytearray()
+    pointsExtraData = None
+    extraData = None
+    if data[-1].__class__ is dict:
+        extraData = data[-1]
+        data = data[:-1]
+    for index, arr in enumerate(data):
+        if arr[-1].__class__ is dict:
+            if pointsExtraData is None:
+                pointsExtraData = {}
+            pointsExtraData[index] = arr[-1]
+            arr = arr[:-1]
+        x, y = arr[0], arr[1]
+        coordinates.append(x)
+        coordinates.append(y)
+        length = len(arr)
+        flags.append(point_flags(
+            arr[2] if length > 2 else None,
+            length > 3 and arr[3]) | number_flags(x, y))
+    return CompactPath(coordinates, flags, pointsExtraData, extraData)
+
+
+def _unstructure_CompactPath(path, dumps=None):
+    data = []
+    coordinates = path._coordinates
+    pointsExtraData = path._pointsExtraData or {}
+    for index, flags in enumerate(path._flags):
+        # integer coordinates are written back as such, like Point's
+        x, y = coordinates[2 * index], coordinates[2 * index + 1]
+        if flags & INT_X:
+            x = int(x)
+        if flags & INT_Y:
+            y = int(y)
+        ptType = point_type(flags)
+        if ptType is not None:
+            if flags & SMOOTH:
+                value = (x, y, ptType, True)
+            else:
+                value = (x, y, ptType)
+        else:
+            value = (x, y)
+        extraData = pointsExtraData.get(index)
+        if extraData:
+            value += (extraData,)
+        if dumps is not None:
+            value = RawJSON(dumps(value))
+        data.append(value)
+    if path._extraData:
+        data.append(path._extraData)
+    return data
+
+
+_whitespace = re.compile(r"[ \t\n\r]*").match
+
+
+def _scan_font(text, lazy=True):
+    """
+    Decodes the JSON text of a font, except for its glyphs which are
+    returned as a list of _GlyphData holding their raw JSON (None if the
+    font has no glyphs list). If *lazy* is false, the list holds the
+    decoded glyph and raw JSON of each glyph instead.
+    """
+    decoder = JSONDecoder()
+    data = {}
+    glyphs = None
+    index = _whitespace(text, 0).end()
+    if text[index:index + 1] != "{":
+        raise ValueError("font data is not a JSON object")
+    index = _whitespace(text, index + 1).end()
+    if text[index:index + 1] == "}":
+        return data, glyphs
+    while True:
+        if text[index:index + 1] != '"':
+            raise ValueError(f"expected a key at char {index}")
+        key, index = scanstring(text, index + 1)
+        index = _whitespace(text, index).end()
+        if text[index:index + 1] != ":":
+            raise ValueError(f"expected ':' at char {index}")
+        index = _whitespace(text, index + 1).end()
+        if key == "glyphs" and text[index:index + 1] == "[":
+            glyphs = []
+            index = _whitespace(text, index + 1).end()
+            if text[index:index + 1] == "]":
+                index = _whitespace(text, index + 1).end()
+            else:
+                while True:
+                    # glyphs are decoded once to find where they end. lazily,
+                    # only name and unicodes are kept for the font indexes
+                    glyph, end = decoder.raw_decode(text, index)
+                    if lazy:
+                        glyphs.append(_GlyphData(
+                            glyph.get("name"), glyph.get("unicodes"),
+                            text[index:end]))
+                    else:
+                        glyphs.append((glyph, text[index:end]))
+                    index = _whitespace(text, end).end()
+                    char = text[index:index + 1]
+                    index = _whitespace(text, index + 1).end()
+                    if char == "]":
+                        break
+                    if char != ",":
+                        raise ValueError(f"expected ',' at char {index}")
+        else:
+            data[key], index = decoder.raw_decode(text, index)
+            index = _whitespace(text, index).end()
+        char = text[index:index + 1]
+        index = _whitespace(text, index + 1).end()
+        if char == "}":
+            return data, glyphs
+        if char != ",":
+            raise ValueError(f"expected ',' at char {index}")
+
+
+# characters that may go on a JSON number
+_numberChars = frozenset(".eE+-0123456789")
+
+
+class _JSONReader:
+    """
+    Decodes the JSON values of a text file one at a time, reading it in
+    chunks so that only the value being decoded is held in memory.
+    """
+    __slots__ = "_buffer", "_decoder", "_file", "_index"
+
+    chunkSize = 1 << 16
+
+    def __init__(self, file):
+        self._buffer = ""
+        self._decoder = JSONDecoder()
+        self._file = file
+        self._index = 0
+
+    def char(self):
+        """
+        Returns the next non-whitespace character and moves past it, or an
+        empty string at the end of the file.
+        """
+        char = self.peek()
+        if char:
+            self._index += 1
+        return char
+
+    def peek(self):
+        while True:
+            buffer = self._buffer
+            index = self._index = _whitespace(buffer, self._index).end()
+            if index < len(buffer):
+                return buffer[index]
+            if not self._read():
+                return ""
+
+    def string(self):
+        """
+        Returns the string after the opening quote that was just read.
+        """
+        return self._decode(scanstring)
+
+    def value(self):
+        self.peek()
+        return self._decode(self._decoder.raw_decode)
+
+    #
+
+    def _decode(self, function):
+        while True:
+            buffer = self._buffer
+            try:
+                value, end = function(buffer, self._index)
+            except ValueError:
+                # the value may be cut by the end of the chunk
+                if not self._read():
+                    raise
+                continue
+            # a number may go on in the next chunk, past its integer part
+            # or a fraction or exponent that was decoded without its digits
+            if end < len(buffer) and buffer[end] not in _numberChars or \
+                    not self._read():
+                self._index = end
+                return value
+
+    def _read(self):
+        buffer = self._buffer[self._index:]
+        # read at least what is buffered, so that values that span many
+        # chunks are decoded again a logarithmic number of times
+        data = self._file.read(max(self.chunkSize, len(buffer)))
+        self._buffer = buffer + data
+        self._index = 0
+        return bool(data)
+
+
+class _GlyphData:
+    """
+    A glyph not structured yet, in a LazyGlyphList. *data* is as read by
+    the converter of the list: JSON text, or bytes in binary fonts.
+    """
+    __slots__ = "name", "unicodes", "data", "__weakref__"
+
+    def __init__(self, name, unicodes, data):
+        self.name = name
+        self.unicodes = unicodes
+        self.data = data
+
+    @property
+    def unicode(self):
+        unicodes = self.unicodes
+        if unicodes:
+            return unicodes[0]
+        return None
+
+
+class LazyGlyphList(list):
+    """
+    The glyphs list of a font opened in lazy mode. Glyphs are kept as read
+    and structured the first time they are accessed.
+
+    Methods that look at the items (search, comparison, copy, sort) first
+    structure all the glyphs, list.__iter__() gives the raw items.
+    """
+    __slots__ = "_converter", "_font"
+
+    def __init__(self, items, converter, font):
+        super().__init__(items)
+        self._converter = converter
+        self._font = font
+
+    def __add__(self, other):
+        self._load()
+        return super().__add__(other)
+
+    def __contains__(self, value):
+        self._load()
+        return super().__contains__(value)
+
+    def __eq__(self, other):
+        self._load_both(other)
+        return super().__eq__(other)
+
+    def __ge__(self, other):
+        self._load_both(other)
+        return super().__ge__(other)
+
+    def __getitem__(self, key):
+        if key.__class__ is slice:
+            return [self[index] for index in range(*key.indices(len(self)))]
+        item = super().__getitem__(key)
+        if item.__class__ is _GlyphData:
+            item = self._converter._structure_glyph_data(item)
+            item._parent = self._font
+            super().__setitem__(key, item)
+        return item
+
+    def __gt__(self, other):
+        self._load_both(other)
+        return super().__gt__(other)
+
+    def __imul__(self, count):
+        self._load()
+        return super().__imul__(count)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __le__(self, other):
+        self._load_both(other)
+        return super().__le__(other)
+
+    def __lt__(self, other):
+        self._load_both(other)
+        return super().__lt__(other)
+
+    def __mul__(self, count):
+        self._load()
+        return super().__mul__(count)
+
+    def __ne__(self, other):
+        self._load_both(other)
+        return super().__ne__(other)
+
+    def __radd__(self, other):
+        # tried before list.__add__() of *other*, which would copy raw items
+        if not isinstance(other, list):
+            return NotImplemented
+        self._load()
+        return list(other) + list(self)
+
+    def __repr__(self):
+        self._load()
+        return super().__repr__()
+
+    def __reversed__(self):
+        for index in range(len(self) - 1, -1, -1):
+            yield self[index]
+
+    __rmul__ = __mul__
+
+    def copy(self):
+        self._load()
+        return super().copy()
+
+    def count(self, value):
+        self._load()
+        return super().count(value)
+
+    def index(self, value, *args):
+        self._load()
+        return super().index(value, *args)
+
+    def pop(self, index=-1):
+        item = self[index]
+        del self[index]
+        return item
+
+    def remove(self, value):
+        self._load()
+        super().remove(value)
+
+    def sort(self, *args, **kwargs):
+        self._load()
+        super().sort(*args, **kwargs)
+
+    def _load(self):
+        for index in range(len(self)):
+            self[index]
+
+    def _load_both(self, other):
+        self._load()
+        if other.__class__ is LazyGlyphList:
+            other._load()
+
+
 class TFontConverter(cattr.Converter):
-    __slots__ = "_font", "_indent"
+    """
+    Converts Font objects from/to the .tfont JSON format.
+
+    With *compactPaths* set, paths are loaded as CompactPath objects. With
+    *lazy* set, glyphs are structured only when first accessed (see
+    LazyGlyphList).
+
+    The JSON of each glyph is kept from open() and between saves, and reused
+    until the glyph changes, so that saving after an edit only serializes
+    the glyphs that were modified; glyphs of a lazy font that were never
+    accessed are written back as they were read. Changes are tracked through the object
+    properties and lists. A layer's location dict or a component's
+    transformation changed in place must be assigned back for the glyph to
+    be serialized anew.
+    """
+    __slots__ = "_font", "_fragments", "_indent", "_lazy"
 
     version = 0
 
-    def __init__(self, indent=0, **kwargs):
+    def __init__(self, indent=0, compactPaths=False, lazy=False, **kwargs):
         super().__init__(**kwargs)
+        self._fragments = WeakKeyDictionary()
         self._indent = indent
+        self._lazy = lazy
 
         # datetime
         dateFormat = '%Y-%m-%d %H:%M:%S'
@@ -102,26 +461,110 @@ class TFontConverter(cattr.Converter):
         self.register_structure_hook(Matrix3x2, structure_seq)
         self.register_unstructure_hook(Matrix3x2, unstructure_seq)
         # Path
-        self.register_structure_hook(Path, _structure_Path)
+        if compactPaths:
+            self.register_structure_hook(Path, _structure_CompactPath)
+        else:
+            self.register_structure_hook(Path, _structure_Path)
         if indent is None:
             self.register_unstructure_hook(Path, _unstructure_Path_base)
+            self.register_unstructure_hook(
+                CompactPath, _unstructure_CompactPath)
         else:
             self.register_unstructure_hook(Path, _unstructure_Path)
-
+            self.register_unstructure_hook(
+                CompactPath,
+                lambda path: _unstructure_CompactPath(path, json.dumps))
+        # LazyGlyphList
+        self.register_unstructure_hook(
+            LazyGlyphList, self._unstructure_LazyGlyphList)
 
     def open(self, path, font=None):
+        # the JSON of glyphs is kept, so that they are written back as they
+        # were read until they change
         with open(path, 'r') as file:
-            d = json.load(file)
+            d, glyphs = _scan_font(file.read(), self._lazy)
         # XXX: default to 0 for now because Fonte doesn't add this attr
         assert self.version >= d.pop(".formatVersion", 0)
+        if glyphs is not None and not self._lazy:
+            d["glyphs"] = [glyph for glyph, _ in glyphs]
         if font is not None:
             self._font = font
-        return self.structure(d, Font)
+        font = self.structure(d, Font)
+        if glyphs:
+            if self._lazy:
+                font._glyphs = LazyGlyphList(glyphs, self, font)
+            else:
+                for glyph, (_, text) in zip(font._glyphs, glyphs):
+                    self._seed_glyph(glyph, text)
+        return font
+
+    def iterGlyphs(self, path):
+        """
+        Generates the glyphs of the font at *path* as they are read, without
+        loading the font: the file is read in chunks and only the glyph being
+        decoded is held in memory. The glyphs don't belong to a font.
+        """
+        with open(path, 'r') as file:
+            reader = _JSONReader(file)
+            if reader.char() != "{":
+                raise ValueError("font data is not a JSON object")
+            if reader.peek() == "}":
+                return
+            while True:
+                if reader.char() != '"':
+                    raise ValueError("expected a key")
+                key = reader.string()
+                if reader.char() != ":":
+                    raise ValueError("expected ':'")
+                if key == "glyphs":
+                    if reader.char() != "[":
+                        raise ValueError("expected a glyphs list")
+                    if reader.peek() == "]":
+                        return
+                    while True:
+                        yield self.structure(reader.value(), Glyph)
+                        char = reader.char()
+                        if char == "]":
+                            # the rest is font data
+                            return
+                        if char != ",":
+                            raise ValueError("expected ','")
+                value = reader.value()
+                if key == ".formatVersion":
+                    assert self.version >= value
+                char = reader.char()
+                if char == "}":
+                    return
+                if char != ",":
+                    raise ValueError("expected ','")
 
     def save(self, font, path):
-        d = self.unstructure(font)
+        indent = self._indent
+        # glyphs are written one by one where the marker is, so that the JSON
+        # of the whole font is never held in memory. control characters are
+        # escaped in JSON strings, so the marker can't be found elsewhere
+        d = self.unstructure_attrs_asdict(
+            font, values={"_glyphs": RawJSON("\x01")})
+        parts = json.dumps(d, indent=indent).split("\x01")
         with open(path, 'w') as file:
-            json.dump(d, file, indent=self._indent)
+            file.write(parts[0])
+            if len(parts) > 1:
+                if indent is None:
+                    start, separator, end = "[", ",", "]"
+                else:
+                    newline = "\n" + " " * 2 * indent
+                    start, separator, end = \
+                        "[" + newline, "," + newline, "\n" + " " * indent + "]"
+                file.write(start)
+                for index, glyph in enumerate(self._iter_glyphs(font._glyphs)):
+                    if index:
+                        file.write(separator)
+                    if glyph.__class__ is _GlyphData:
+                        file.write(glyph.data)
+                    else:
+                        file.write(self._glyph_json(glyph))
+                file.write(end)
+                file.write(parts[1])
         return True, []
 
     def structure_attrs_fromdict(self, obj, cl):
@@ -152,7 +595,12 @@ class TFontConverter(cattr.Converter):
                 pass
         return cl(**conv_obj)
 
-    def unstructure_attrs_asdict(self, obj):
+    def unstructure_attrs_asdict(self, obj, skip=(), values=None):
+        """
+        Returns the dict of *obj*'s attributes, except for those named in
+        *skip* and those that have trivial values. *values* maps attribute
+        names to values that are used as they are.
+        """
         cls = obj.__class__
         attrs = cls.__attrs_attrs__
         dispatch = self._unstructure_func.dispatch
@@ -166,6 +614,8 @@ class TFontConverter(cattr.Converter):
             if not a.init:
                 continue
             name = a.name
+            if name in skip:
+                continue
             v = getattr(obj, name)
             if not v:
                 # skip attrs that have trivial default values set
@@ -174,8 +624,66 @@ class TFontConverter(cattr.Converter):
                 # skip empty collections
                 if isinstance(v, Collection):
                     continue
+            if values is not None and name in values:
+                v = values[name]
+            else:
+                v = dispatch(v.__class__)(v)
             # remove underscore from private attrs
             if name[0] == "_":
                 name = name[1:]
-            rv[name] = dispatch(v.__class__)(v)
+            rv[name] = v
         return rv
+
+    #
+
+    def _glyph_json(self, glyph):
+        """
+        Returns the JSON of *glyph* as it appears in the glyphs list of the
+        font, reused until the glyph changes.
+        """
+        changeCount = glyph._changeCount
+        fragment = self._fragments.get(glyph)
+        # change events are deferred during a batch update
+        if fragment is not None and fragment[0] == changeCount and \
+                not in_batch_update():
+            return fragment[1]
+        indent = self._indent
+        text = json.dumps(self.unstructure_attrs_asdict(glyph), indent=indent)
+        if indent:
+            # glyphs are two levels deep in the font, in the glyphs list
+            text = text.replace("\n", "\n" + " " * 2 * indent)
+        self._fragments[glyph] = changeCount, text
+        return text
+
+    def _iter_glyphs(self, glyphs):
+        """
+        Iterates over *glyphs*. The glyphs of a LazyGlyphList read by a
+        converter like this one that were never accessed come as _GlyphData,
+        so that they are written back as they were read; others are
+        structured.
+        """
+        if glyphs.__class__ is LazyGlyphList:
+            converter = glyphs._converter
+            if converter.__class__ is self.__class__ and \
+                    converter._indent == self._indent:
+                return list.__iter__(glyphs)
+        return iter(glyphs)
+
+    def _seed_glyph(self, glyph, text):
+        # reuse the JSON *glyph* was read from, if it is laid out as this
+        # converter writes glyphs in the font
+        indent = self._indent
+        if indent is None:
+            prefix = '{"'
+        else:
+            prefix = "{\n" + " " * 3 * indent + '"'
+        if text.startswith(prefix):
+            self._fragments[glyph] = glyph._changeCount, text
+
+    def _structure_glyph_data(self, glyphData):
+        glyph = self.structure(json.loads(glyphData.data), Glyph)
+        self._seed_glyph(glyph, glyphData.data)
+        return glyph
+
+    def _unstructure_LazyGlyphList(self, glyphs):
+        return [self.unstructure(glyph) for glyph in glyphs]
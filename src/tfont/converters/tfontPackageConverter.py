@@ -0,0 +1,203 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import rapidjson as json
+from tfont.converters.tfontConverter import LazyGlyphList, TFontConverter, \
+    _GlyphData
+from tfont.objects.font import Font
+from tfont.objects.glyph import Glyph
+from tfont.util.observable import in_batch_update
+from weakref import WeakKeyDictionary
+
+# characters that can't appear in file names on some platforms
+_illegalCharacters = set('"*+/:<>?[\\]|\x7f') | {chr(i) for i in range(32)}
+_reservedNames = {
+    "con", "prn", "aux", "clock$", "nul", "a:-z:", "com1", "com2", "com3",
+    "com4", "com5", "com6", "com7", "com8", "com9", "lpt1", "lpt2", "lpt3",
+    "lpt4", "lpt5", "lpt6", "lpt7", "lpt8", "lpt9",
+}
+_maxFileNameLength = 200
+
+
+def glyph_file_name(name, existing):
+    """
+    Returns the file name of glyph *name*, unique across the lowercased
+    names in *existing* (which it is added to) so that packages work on
+    case-insensitive file systems. Uppercase letters are followed by an
+    underscore to keep names distinct, as in UFO.
+    """
+    chars = []
+    for char in name:
+        if char in _illegalCharacters:
+            char = "_"
+        elif char != char.lower():
+            char += "_"
+        chars.append(char)
+    fileName = "".join(chars)
+    if fileName.startswith("."):
+        fileName = "_" + fileName[1:]
+    fileName = ".".join(
+        "_" + part if part.lower() in _reservedNames else part
+        for part in fileName.split("."))[:_maxFileNameLength]
+    candidate = fileName
+    counter = 1
+    while candidate.lower() in existing:
+        candidate = "%s%02d" % (fileName, counter)
+        counter += 1
+    existing.add(candidate.lower())
+    return candidate + ".json"
+
+
+def _read_text(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return file.read()
+
+
+def _write_if_changed(path, text):
+    """
+    Writes *text* to *path* unless the file already holds it. Returns
+    whether the file was written.
+    """
+    try:
+        if _read_text(path) == text:
+            return False
+    except FileNotFoundError:
+        pass
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
+    return True
+
+
+class TFontPackageConverter(TFontConverter):
+    """
+    Converts Font objects from/to the .tfont package format: a directory
+    with the font data in font.json, and each glyph in its own file of the
+    glyphs directory. font.json lists the glyph files in glyph order.
+
+    Files are read and written in a pool of *workers* threads. save() only
+    writes files whose contents changed and removes the files of deleted
+    glyphs, so that an edit touches few files. Glyphs that haven't changed
+    since this converter last read or saved them from/to the same file are
+    skipped without reading the file back, so files edited behind its back
+    in the meantime are not rewritten.
+    """
+    __slots__ = "_glyphFiles", "_workers"
+
+    fontFileName = "font.json"
+    glyphsDirName = "glyphs"
+
+    def __init__(self, indent=0, compactPaths=False, lazy=False, workers=None,
+                 **kwargs):
+        super().__init__(indent, compactPaths, lazy, **kwargs)
+        # glyph -> (changeCount, text, path) of the files last saved
+        self._glyphFiles = WeakKeyDictionary()
+        self._workers = workers
+
+    def iterGlyphs(self, path):
+        d = json.loads(_read_text(os.path.join(path, self.fontFileName)))
+        # XXX: default to 0 for now because Fonte doesn't add this attr
+        assert self.version >= d.pop(".formatVersion", 0)
+        glyphsDir = os.path.join(path, self.glyphsDirName)
+        for fileName in d.get("glyphs", ()):
+            yield self.structure(json.loads(_read_text(
+                os.path.join(glyphsDir, fileName))), Glyph)
+
+    def open(self, path, font=None):
+        d = json.loads(_read_text(os.path.join(path, self.fontFileName)))
+        # XXX: default to 0 for now because Fonte doesn't add this attr
+        assert self.version >= d.pop(".formatVersion", 0)
+        glyphsDir = os.path.join(path, self.glyphsDirName)
+        paths = [
+            os.path.join(glyphsDir, fileName)
+            for fileName in d.pop("glyphs", ())]
+        with ThreadPoolExecutor(self._workers) as executor:
+            texts = list(executor.map(_read_text, paths))
+
+        if self._lazy:
+            glyphs = []
+            for text in texts:
+                glyph = json.loads(text)
+                glyphs.append(_GlyphData(
+                    glyph.get("name"), glyph.get("unicodes"), text))
+        else:
+            glyphs = None
+            d["glyphs"] = [json.loads(text) for text in texts]
+        if font is not None:
+            self._font = font
+        font = self.structure(d, Font)
+        if self._lazy and texts:
+            font._glyphs = LazyGlyphList(glyphs, self, font)
+        else:
+            glyphs = font._glyphs
+        # glyphs are saved to the files they were read from until they
+        # change, without reading them back
+        glyphFiles = self._glyphFiles
+        for glyph, text, glyphPath in zip(glyphs, texts, paths):
+            changeCount = None if glyph.__class__ is _GlyphData \
+                else glyph._changeCount
+            glyphFiles[glyph] = changeCount, text, glyphPath
+        return font
+
+    def save(self, font, path):
+        indent = self._indent
+        glyphsDir = os.path.join(path, self.glyphsDirName)
+        os.makedirs(glyphsDir, exist_ok=True)
+
+        glyphFiles = self._glyphFiles
+        # the directory may have changed since the last save
+        onDisk = set(os.listdir(glyphsDir))
+        # change events are deferred during a batch update
+        batched = in_batch_update()
+        existing = set()
+        fileNames = []
+        paths = []
+        texts = []
+        saved = []
+        for glyph in self._iter_glyphs(font._glyphs):
+            fileName = glyph_file_name(glyph.name, existing)
+            fileNames.append(fileName)
+            glyphPath = os.path.join(glyphsDir, fileName)
+            # glyphs of a lazy font that were never accessed are unchanged
+            if glyph.__class__ is _GlyphData:
+                glyphFile = glyphFiles.get(glyph)
+                if glyphFile is not None and glyphFile[2] == glyphPath and \
+                        fileName in onDisk:
+                    continue
+                text = glyph.data
+            else:
+                changeCount = glyph._changeCount
+                glyphFile = glyphFiles.get(glyph)
+                if glyphFile is not None and glyphFile[0] == changeCount \
+                        and not batched:
+                    if glyphFile[2] == glyphPath and fileName in onDisk:
+                        continue
+                    text = glyphFile[1]
+                else:
+                    text = json.dumps(
+                        self.unstructure_attrs_asdict(glyph), indent=indent)
+                saved.append((glyph, (changeCount, text, glyphPath)))
+            paths.append(glyphPath)
+            texts.append(text)
+        d = self.unstructure_attrs_asdict(font, skip=("_glyphs",))
+        if fileNames:
+            d["glyphs"] = fileNames
+
+        paths.append(os.path.join(path, self.fontFileName))
+        texts.append(json.dumps(d, indent=indent))
+        with ThreadPoolExecutor(self._workers) as executor:
+            list(executor.map(_write_if_changed, paths, texts))
+            glyphFiles.update(saved)
+            # remove the files of glyphs that are gone
+            staleFileNames = set(os.listdir(glyphsDir)).difference(fileNames)
+            list(executor.map(os.remove, [
+                os.path.join(glyphsDir, fileName)
+                for fileName in staleFileNames if fileName.endswith(".json")]))
+        return True, []
+
+    #
+
+    def _structure_glyph_data(self, glyphData):
+        glyph = self.structure(json.loads(glyphData.data), Glyph)
+        glyphFile = self._glyphFiles.get(glyphData)
+        if glyphFile is not None:
+            self._glyphFiles[glyph] = (glyph._changeCount, *glyphFile[1:])
+        return glyph
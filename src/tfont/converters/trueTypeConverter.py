@@ -0,0 +1,21 @@
+from tfont.converters.openType import TrueTypeFontCompiler
+
+
+class TrueTypeConverter:
+    __slots__ = "_kwargs"
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+
+    def open(self, path, font=None):
+        raise NotImplementedError
+
+    def save(self, font, path):
+        compiler = TrueTypeFontCompiler(font, **self._kwargs)
+        otf, log = compiler.compile()
+
+        ok = not any(entry["level"] == "error" for entry in log)
+        if ok:
+            otf.save(path)
+
+        return ok, log
@@ -14,7 +14,7 @@ class Type2Converter:
         compiler = Type2FontCompiler(font, **self._kwargs)
         otf, log = compiler.compile()
 
-        ok = not any(entry.type == "error" for entry in log)
+        ok = not any(entry["level"] == "error" for entry in log)
         if ok:
             otf.save(path)
 
@@ -101,7 +101,7 @@ class UFOConverter(cattr.Converter):
         if info.xHeight:
             master.xHeight = info.xHeight
         # glyphs
-        font._glyphs.clear()
+        font.glyphs.clear()
         glyphs = font.glyphs
         for glyph_name in ufo_glyph_order(ufo):
             glyph = Glyph(glyph_name)
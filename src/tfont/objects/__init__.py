@@ -1,10 +1,12 @@
 from tfont.objects.anchor import Anchor
 from tfont.objects.axis import Axis
+from tfont.objects.compactPath import CompactPath
 from tfont.objects.component import Component
 from tfont.objects.font import Font
 from tfont.objects.glyph import Glyph
 from tfont.objects.guideline import Guideline
 from tfont.objects.instance import Instance
+from tfont.objects.interpolation import Interpolator
 from tfont.objects.layer import Layer
 from tfont.objects.master import Master
 from tfont.objects.misc import AlignmentZone, Matrix3x2
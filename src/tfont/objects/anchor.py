@@ -4,9 +4,9 @@ from typing import Any, Optional
 
 @attr.s(auto_attribs=True, cmp=False, repr=False, slots=True)
 class Anchor:
-    x: float
-    y: float
-    name: str
+    _x: float
+    _y: float
+    _name: str
 
     _parent: Optional[Any] = attr.ib(default=None, init=False)
     selected: bool = attr.ib(default=False, init=False)
@@ -15,6 +15,39 @@ class Anchor:
         return "%s(%r, %r, %r)" % (
             self.__class__.__name__, self.name, self.x, self.y)
 
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self._name = value
+        layer = self._parent
+        if layer is not None:
+            layer._changed()
+
     @property
     def parent(self):
         return self._parent
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._x = value
+        layer = self._parent
+        if layer is not None:
+            layer._changed()
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self._y = value
+        layer = self._parent
+        if layer is not None:
+            layer._changed()
@@ -0,0 +1,485 @@
+from array import array
+import attr
+from collections.abc import MutableSequence
+from tfont.objects.path import Path
+from tfont.objects.point import Point
+from tfont.util.bezierMath import contourBounds
+from typing import Any, Dict, Optional, Set
+
+# point flags: low bits hold the type, high bit the smooth attribute
+OFFCURVE, MOVE, LINE, CURVE, QCURVE = range(5)
+_types = (None, "move", "line", "curve", "qcurve")
+_typeFlags = {type_: flag for flag, type_ in enumerate(_types)}
+SMOOTH = 0x80
+TYPE_MASK = 0x1F
+# whether the x, y coordinates are integers, so that they are saved as
+# they were read, like Point coordinates
+INT_X = 0x20
+INT_Y = 0x40
+POINT_MASK = SMOOTH | TYPE_MASK
+# flags -> type bytes table, for bytes.translate()
+_typeTable = bytes(flags & TYPE_MASK for flags in range(256))
+# flags -> type and smooth bytes table
+_pointTable = bytes(flags & POINT_MASK for flags in range(256))
+
+
+def point_flags(type_, smooth):
+    try:
+        flags = _typeFlags[type_]
+    except KeyError:
+        raise ValueError(f"unsupported point type '{type_}'")
+    if smooth:
+        flags |= SMOOTH
+    return flags
+
+
+def point_type(flags):
+    return _types[flags & TYPE_MASK]
+
+
+def number_flags(x, y):
+    flags = 0
+    if x.__class__ is int:
+        flags |= INT_X
+    if y.__class__ is int:
+        flags |= INT_Y
+    return flags
+
+
+@attr.s(auto_attribs=True, cmp=False, repr=False, slots=True)
+class CompactPath:
+    """
+    A Path that stores its points in flat buffers rather than in Point
+    objects: interleaved x, y coordinates in an array('d') and type/smooth
+    flags in a bytearray, which also tell integer coordinates apart. Point extraData and selection are kept sparsely,
+    by index.
+
+    Points are exposed as CompactPoint proxies created on demand.
+    """
+    _coordinates: array = attr.Factory(lambda: array("d"))
+    _flags: bytearray = attr.Factory(bytearray)
+    _pointsExtraData: Optional[Dict[int, Dict]] = None
+
+    _extraData: Optional[Dict] = None
+
+    _parent: Optional[Any] = attr.ib(default=None, init=False)
+    _selection: Optional[Set[int]] = attr.ib(default=None, init=False)
+
+    def __bool__(self):
+        return bool(self._flags)
+
+    def __len__(self):
+        return len(self._flags)
+
+    def __repr__(self):
+        return "%s(%d points)" % (self.__class__.__name__, len(self._flags))
+
+    @property
+    def bounds(self):
+        coordinates = self._coordinates
+        return contourBounds(
+            coordinates[0::2], coordinates[1::2],
+            self._flags.translate(_typeTable), CURVE, MOVE)
+
+    @classmethod
+    def from_path(cls, path):
+        coordinates = array("d")
+        flags = bytearray()
+        pointsExtraData = None
+        for index, point in enumerate(path._points):
+            x, y = point.x, point.y
+            coordinates.append(x)
+            coordinates.append(y)
+            flags.append(
+                point_flags(point.type, point.smooth) | number_flags(x, y))
+            if point._extraData:
+                if pointsExtraData is None:
+                    pointsExtraData = {}
+                pointsExtraData[index] = point._extraData
+        compactPath = cls(coordinates, flags, pointsExtraData, path._extraData)
+        selection = {
+            index for index, point in enumerate(path._points)
+            if point.selected}
+        if selection:
+            compactPath._selection = selection
+        return compactPath
+
+    @property
+    def extraData(self):
+        extraData = self._extraData
+        if extraData is None:
+            extraData = self._extraData = {}
+        # extraData is changed in place
+        self._changed()
+        return extraData
+
+    @property
+    def parent(self):
+        return self._parent
+
+    @property
+    def points(self):
+        return CompactPointList(self)
+
+    def to_path(self):
+        coordinates = self._coordinates
+        pointsExtraData = self._pointsExtraData or {}
+        selection = self._selection or ()
+        points = []
+        for index, flags in enumerate(self._flags):
+            x, y = coordinates[2 * index], coordinates[2 * index + 1]
+            if flags & INT_X:
+                x = int(x)
+            if flags & INT_Y:
+                y = int(y)
+            point = Point(
+                x, y, _types[flags & TYPE_MASK], bool(flags & SMOOTH))
+            point._extraData = pointsExtraData.get(index)
+            point.selected = index in selection
+            points.append(point)
+        return Path(points, self._extraData)
+
+    def transform(self, matrix, selectionOnly=False):
+        # like Point coordinates, transformed ones stay integers only if the
+        # matrix values are
+        integral = all(value.__class__ is int for value in matrix)
+        if selectionOnly:
+            selection = self._selection
+            if not selection:
+                return
+            mask = bytearray(len(self._flags))
+            for index in selection:
+                mask[index] = 1
+            if not integral:
+                flags = self._flags
+                for index in selection:
+                    flags[index] &= POINT_MASK
+        else:
+            mask = None
+            if not integral:
+                self._flags = self._flags.translate(_pointTable)
+        matrix.transformPoints(self._coordinates, mask)
+        self._bounds_changed()
+
+    #
+
+    def _bounds_changed(self):
+        layer = self._parent
+        if layer is not None:
+            layer._pathsBounds = None
+            layer._changed()
+
+    def _changed(self):
+        layer = self._parent
+        if layer is not None:
+            layer._changed()
+
+    def _transformed_bounds(self, matrix):
+        coordinates = array("d", self._coordinates)
+        matrix.transformPoints(coordinates)
+        return contourBounds(
+            coordinates[0::2], coordinates[1::2],
+            self._flags.translate(_typeTable), CURVE, MOVE)
+
+    # sparse index maps must follow insertions and deletions
+
+    def _shift_indices(self, start, delta):
+        extraData = self._pointsExtraData
+        if extraData:
+            self._pointsExtraData = {
+                index + delta if index >= start else index: value
+                for index, value in extraData.items()
+                if not start <= index < start - delta
+            }
+        selection = self._selection
+        if selection:
+            self._selection = {
+                index + delta if index >= start else index
+                for index in selection
+                if not start <= index < start - delta
+            }
+
+
+class CompactPoint:
+    """
+    A view of a point in a CompactPath's buffers, with the same interface
+    as Point.
+
+    The view is bound to an index, so it doesn't follow its point when
+    points are inserted or removed before it.
+    """
+    __slots__ = "_parent", "_index"
+
+    def __init__(self, path, index):
+        self._parent = path
+        self._index = index
+
+    def __repr__(self):
+        type_ = self.type
+        if type_ is not None:
+            more = ", %r" % type_
+            if self.smooth:
+                more += ", smooth=%r" % self.smooth
+        else:
+            more = ""
+        return "%s(%r, %r%s)" % (
+            self.__class__.__name__, self.x, self.y, more)
+
+    @property
+    def extraData(self):
+        path = self._parent
+        pointsExtraData = path._pointsExtraData
+        if pointsExtraData is None:
+            pointsExtraData = path._pointsExtraData = {}
+        # extraData is changed in place
+        path._changed()
+        try:
+            return pointsExtraData[self._index]
+        except KeyError:
+            extraData = pointsExtraData[self._index] = {}
+            return extraData
+
+    @property
+    def parent(self):
+        return self._parent
+
+    @property
+    def selected(self):
+        selection = self._parent._selection
+        return selection is not None and self._index in selection
+
+    @selected.setter
+    def selected(self, value):
+        path = self._parent
+        selection = path._selection
+        if value:
+            if selection is None:
+                selection = path._selection = set()
+            selection.add(self._index)
+        elif selection is not None:
+            selection.discard(self._index)
+
+    @property
+    def smooth(self):
+        return bool(self._parent._flags[self._index] & SMOOTH)
+
+    @smooth.setter
+    def smooth(self, value):
+        flags = self._parent._flags
+        if value:
+            flags[self._index] |= SMOOTH
+        else:
+            flags[self._index] &= ~SMOOTH
+        self._parent._changed()
+
+    @property
+    def type(self):
+        return _types[self._parent._flags[self._index] & TYPE_MASK]
+
+    @type.setter
+    def type(self, value):
+        flags = self._parent._flags
+        index = self._index
+        flags[index] = point_flags(value, False) | flags[index] & ~TYPE_MASK
+        self._parent._bounds_changed()
+
+    @property
+    def x(self):
+        return self._parent._coordinates[2 * self._index]
+
+    @x.setter
+    def x(self, value):
+        path = self._parent
+        index = self._index
+        path._coordinates[2 * index] = value
+        if value.__class__ is int:
+            path._flags[index] |= INT_X
+        else:
+            path._flags[index] &= ~INT_X
+        path._bounds_changed()
+
+    @property
+    def y(self):
+        return self._parent._coordinates[2 * self._index + 1]
+
+    @y.setter
+    def y(self, value):
+        path = self._parent
+        index = self._index
+        path._coordinates[2 * index + 1] = value
+        if value.__class__ is int:
+            path._flags[index] |= INT_Y
+        else:
+            path._flags[index] &= ~INT_Y
+        path._bounds_changed()
+
+
+class CompactPointList(MutableSequence):
+    """
+    The points sequence of a CompactPath. Items are CompactPoint views,
+    and Point-like objects can be stored into it.
+    """
+    __slots__ = "_path",
+
+    def __init__(self, path):
+        self._path = path
+
+    def __delitem__(self, key):
+        path = self._path
+        length = len(path._flags)
+        if key.__class__ is slice:
+            start, stop, step = key.indices(length)
+            if step != 1:
+                for index in sorted(range(start, stop, step), reverse=True):
+                    del self[index]
+                return
+        else:
+            if key < 0:
+                key += length
+            if not 0 <= key < length:
+                raise IndexError("point index out of range")
+            start, stop = key, key + 1
+        if start >= stop:
+            return
+        del path._coordinates[2 * start:2 * stop]
+        del path._flags[start:stop]
+        path._shift_indices(start, start - stop)
+        path._bounds_changed()
+
+    def __getitem__(self, key):
+        path = self._path
+        length = len(path._flags)
+        if key.__class__ is slice:
+            return [CompactPoint(path, index)
+                    for index in range(*key.indices(length))]
+        if key < 0:
+            key += length
+        if not 0 <= key < length:
+            raise IndexError("point index out of range")
+        return CompactPoint(path, key)
+
+    def __iter__(self):
+        path = self._path
+        for index in range(len(path._flags)):
+            yield CompactPoint(path, index)
+
+    def __len__(self):
+        return len(self._path._flags)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def __setitem__(self, key, value):
+        path = self._path
+        length = len(path._flags)
+        if key.__class__ is slice:
+            start, stop, step = key.indices(length)
+            # unpack first, values may be views of the points replaced
+            values = [self._unpack(point) for point in value]
+            if step != 1:
+                indices = range(start, stop, step)
+                if len(indices) != len(values):
+                    raise ValueError(
+                        "attempt to assign sequence of size %d to extended "
+                        "slice of size %d" % (len(values), len(indices)))
+                for index, values_ in zip(indices, values):
+                    self._store(index, values_)
+                path._bounds_changed()
+                return
+            stop = max(start, stop)
+            coordinates = array("d")
+            flags = bytearray()
+            for x, y, flags_, _, _ in values:
+                coordinates.append(x)
+                coordinates.append(y)
+                flags.append(flags_)
+            path._coordinates[2 * start:2 * stop] = coordinates
+            path._flags[start:stop] = flags
+            path._shift_indices(start, start - stop)
+            path._shift_indices(start, len(values))
+            for index, (_, _, _, extraData, selected) in enumerate(
+                    values, start):
+                self._store_sparse(index, extraData, selected)
+            path._bounds_changed()
+            return
+        if key < 0:
+            key += length
+        if not 0 <= key < length:
+            raise IndexError("point index out of range")
+        self._store(key, self._unpack(value))
+        path._bounds_changed()
+
+    def insert(self, index, value):
+        path = self._path
+        length = len(path._flags)
+        if index < 0:
+            index = max(index + length, 0)
+        elif index > length:
+            index = length
+        x, y, flags, extraData, selected = self._unpack(value)
+        path._coordinates[2 * index:2 * index] = array("d", (x, y))
+        path._flags.insert(index, flags)
+        path._shift_indices(index, 1)
+        self._store_sparse(index, extraData, selected)
+        path._bounds_changed()
+
+    def extend(self, values):
+        path = self._path
+        coordinates = path._coordinates
+        flags = path._flags
+        for value in values:
+            x, y, flags_, extraData, selected = self._unpack(value)
+            coordinates.append(x)
+            coordinates.append(y)
+            flags.append(flags_)
+            self._store_sparse(len(flags) - 1, extraData, selected)
+        path._bounds_changed()
+
+    #
+
+    @staticmethod
+    def _unpack(point):
+        if point.__class__ is CompactPoint:
+            path = point._parent
+            index = point._index
+            extraData = path._pointsExtraData
+            return (
+                path._coordinates[2 * index],
+                path._coordinates[2 * index + 1],
+                path._flags[index],
+                extraData.get(index) if extraData else None,
+                point.selected,
+            )
+        x, y = point.x, point.y
+        return (
+            x,
+            y,
+            point_flags(point.type, point.smooth) | number_flags(x, y),
+            point._extraData,
+            point.selected,
+        )
+
+    def _store(self, index, values):
+        path = self._path
+        x, y, flags, extraData, selected = values
+        path._coordinates[2 * index] = x
+        path._coordinates[2 * index + 1] = y
+        path._flags[index] = flags
+        self._store_sparse(index, extraData, selected)
+
+    def _store_sparse(self, index, extraData, selected):
+        path = self._path
+        pointsExtraData = path._pointsExtraData
+        if extraData:
+            if pointsExtraData is None:
+                pointsExtraData = path._pointsExtraData = {}
+            pointsExtraData[index] = extraData
+        elif pointsExtraData:
+            pointsExtraData.pop(index, None)
+        selection = path._selection
+        if selected:
+            if selection is None:
+                selection = path._selection = set()
+            selection.add(index)
+        elif selection:
+            selection.discard(index)
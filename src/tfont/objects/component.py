@@ -5,8 +5,8 @@ from typing import Any, Optional
 
 @attr.s(auto_attribs=True, cmp=False, repr=False, slots=True)
 class Component:
-    glyphName: str
-    transformation: Matrix3x2 = attr.Factory(Matrix3x2)
+    _glyphName: str
+    _transformation: Matrix3x2 = attr.Factory(Matrix3x2)
 
     _parent: Optional[Any] = attr.ib(default=None, init=False)
     selected: bool = attr.ib(default=False, init=False)
@@ -22,6 +22,17 @@ class Component:
         except (AttributeError, KeyError):
             pass
 
+    @property
+    def glyphName(self):
+        return self._glyphName
+
+    @glyphName.setter
+    def glyphName(self, value):
+        self._glyphName = value
+        layer = self._parent
+        if layer is not None:
+            layer._changed()
+
     @property
     def layer(self):
         layer = self._parent
@@ -38,3 +49,14 @@ class Component:
     @property
     def parent(self):
         return self._parent
+
+    @property
+    def transformation(self):
+        return self._transformation
+
+    @transformation.setter
+    def transformation(self, value):
+        self._transformation = value
+        layer = self._parent
+        if layer is not None:
+            layer._changed()
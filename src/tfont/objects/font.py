@@ -5,6 +5,7 @@ from tfont.objects.glyph import Glyph
 from tfont.objects.instance import Instance
 from tfont.objects.master import Master, fontMasterList
 from tfont.objects.misc import observable_list
+from tfont.util.observable import ChangeType, batch_update, in_batch_update
 from typing import Dict, List, Optional
 
 
@@ -30,6 +31,13 @@ class Font:
     _extraData: Optional[Dict] = None
 
     _selectedMaster: Optional[int] = attr.ib(default=None, init=False)
+    _observables: Optional[Dict] = attr.ib(default=None, init=False)
+
+    # glyph name/codepoint -> glyph index, built lazily and maintained by
+    # change events on the glyphs list. None means out-of-date.
+    _nameIndex: Optional[Dict[str, int]] = attr.ib(default=None, init=False)
+    _codepointIndex: Optional[Dict[int, int]] = attr.ib(
+        default=None, init=False)
 
     def __attrs_post_init__(self):
         for axis in self._axes:
@@ -48,7 +56,7 @@ class Font:
 
     @property
     def axes(self):
-        return observable_list(self, self._axes)
+        return observable_list(self, "_axes")
 
     @property
     def extraData(self):
@@ -59,11 +67,11 @@ class Font:
 
     @property
     def glyphs(self):
-        return observable_list(self, self._glyphs)
+        return observable_list(self, "_glyphs", self._glyphs_changed)
 
     @property
     def instances(self):
-        return observable_list(self, self._instances)
+        return observable_list(self, "_instances")
 
     @property
     def layoutEngine(self):
@@ -74,7 +82,7 @@ class Font:
 
     @property
     def masters(self):
-        return observable_list(self, self._masters)
+        return observable_list(self, "_masters")
 
     @property
     def selectedMaster(self):
@@ -89,10 +97,19 @@ class Font:
             if axis.name == tag:
                 return axis
 
+    def batchUpdate(self):
+        """
+        Returns a context manager that defers change notifications until the
+        block ends, when each changed list fires one consolidated event.
+
+        Notably, items added within the block are parented on exit.
+        """
+        return batch_update()
+
     def glyphForName(self, name):
-        for glyph in self._glyphs:
-            if glyph.name == name:
-                return glyph
+        gid = self.glyphIdForName(name)
+        if gid is not None:
+            return self._glyphs[gid]
 
     def glyphForUnicode(self, value):
         gid = self.glyphIdForCodepoint(int(value, 16))
@@ -100,21 +117,68 @@ class Font:
             return self._glyphs[gid]
 
     def glyphIdForCodepoint(self, value, default=None):
-        for index, glyph in enumerate(self._glyphs):
-            uni = glyph.unicode
-            if uni is not None:
-                ch = int(uni, 16)
-                if ch == value:
+        # the indexes are kept by change events, which are deferred during a
+        # batch update
+        if in_batch_update():
+            for index, glyph in enumerate(list.__iter__(self._glyphs)):
+                uni = glyph.unicode
+                if uni is not None and int(uni, 16) == value:
                     return index
-        return default
+            return default
+        codepointIndex = self._codepointIndex
+        if codepointIndex is None:
+            codepointIndex = self._build_codepoint_index()
+        return codepointIndex.get(value, default)
 
     # maybe we could only have glyphForName and inline this func
     def glyphIdForName(self, name):
-        for index, glyph in enumerate(self._glyphs):
-            if glyph.name == name:
-                return index
+        if in_batch_update():
+            for index, glyph in enumerate(list.__iter__(self._glyphs)):
+                if glyph.name == name:
+                    return index
+            return None
+        nameIndex = self._nameIndex
+        if nameIndex is None:
+            nameIndex = self._build_name_index()
+        return nameIndex.get(name)
 
     def masterForName(self, name):
         for master in self._masters:
             if master.name == name:
                 return master
+
+    # glyph indexes
+
+    def _build_codepoint_index(self):
+        codepointIndex = self._codepointIndex = {}
+        # the stored items, so that lazily loaded glyphs stay unloaded
+        self._index_glyphs(
+            None, codepointIndex, list.__iter__(self._glyphs), 0)
+        return codepointIndex
+
+    def _build_name_index(self):
+        nameIndex = self._nameIndex = {}
+        self._index_glyphs(nameIndex, None, list.__iter__(self._glyphs), 0)
+        return nameIndex
+
+    def _glyphs_changed(self, sender, args):
+        # appending is the common case and keeps indexes up-to-date, since it
+        # doesn't shift existing glyphs. anything else invalidates them.
+        if args.action == ChangeType.ADD and \
+                args.newStartingIndex + len(args.newItems) == len(self._glyphs):
+            self._index_glyphs(self._nameIndex, self._codepointIndex,
+                               args.newItems, args.newStartingIndex)
+        else:
+            self._nameIndex = self._codepointIndex = None
+
+    @staticmethod
+    def _index_glyphs(nameIndex, codepointIndex, glyphs, start):
+        # first glyph wins on duplicates, like a linear search would
+        if nameIndex is not None:
+            for index, glyph in enumerate(glyphs, start):
+                nameIndex.setdefault(glyph.name, index)
+        if codepointIndex is not None:
+            for index, glyph in enumerate(glyphs, start):
+                uni = glyph.unicode
+                if uni is not None:
+                    codepointIndex.setdefault(int(uni, 16), index)
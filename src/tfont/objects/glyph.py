@@ -6,22 +6,26 @@ from typing import Any, Dict, List, Optional, Tuple
 
 @attr.s(auto_attribs=True, cmp=False, repr=False, slots=True)
 class Glyph:
-    name: str
-    unicodes: List[str] = attr.Factory(list)
+    _name: str
+    _unicodes: List[str] = attr.Factory(list)
 
-    leftKerningGroup: str = ""
-    rightKerningGroup: str = ""
-    bottomKerningGroup: str = ""
-    topKerningGroup: str = ""
+    _leftKerningGroup: str = ""
+    _rightKerningGroup: str = ""
+    _bottomKerningGroup: str = ""
+    _topKerningGroup: str = ""
 
     _layers: List[Layer] = attr.Factory(list)
 
     # Color format: RGBA8888.
-    color: Optional[Tuple[int, int, int, int]] = None
+    _color: Optional[Tuple[int, int, int, int]] = None
     _extraData: Optional[Dict] = None
 
     _parent: Optional[Any] = attr.ib(default=None, init=False)
+    _observables: Optional[Dict] = attr.ib(default=None, init=False)
     selected: bool = attr.ib(default=False, init=False)
+    # bumped by every change to the glyph or its layers, so that converters
+    # can tell whether what they serialized is still current
+    _changeCount: int = attr.ib(default=0, init=False)
 
     def __attrs_post_init__(self):
         for layer in self._layers:
@@ -31,11 +35,31 @@ class Glyph:
         return "%s(%r, %d layers)" % (
             self.__class__.__name__, self.name, len(self._layers))
 
+    @property
+    def bottomKerningGroup(self):
+        return self._bottomKerningGroup
+
+    @bottomKerningGroup.setter
+    def bottomKerningGroup(self, value):
+        self._bottomKerningGroup = value
+        self._changed()
+
+    @property
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, value):
+        self._color = value
+        self._changed()
+
     @property
     def extraData(self):
         extraData = self._extraData
         if extraData is None:
             extraData = self._extraData = {}
+        # extraData is changed in place
+        self._changed()
         return extraData
 
     @property
@@ -44,15 +68,64 @@ class Glyph:
 
     @property
     def layers(self):
-        return observable_list(self, self._layers)
+        return observable_list(self, "_layers", self._changed)
+
+    @property
+    def leftKerningGroup(self):
+        return self._leftKerningGroup
+
+    @leftKerningGroup.setter
+    def leftKerningGroup(self, value):
+        self._leftKerningGroup = value
+        self._changed()
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self._name = value
+        self._changed()
+        font = self._parent
+        if font is not None:
+            font._nameIndex = None
+
+    @property
+    def rightKerningGroup(self):
+        return self._rightKerningGroup
+
+    @rightKerningGroup.setter
+    def rightKerningGroup(self, value):
+        self._rightKerningGroup = value
+        self._changed()
+
+    @property
+    def topKerningGroup(self):
+        return self._topKerningGroup
+
+    @topKerningGroup.setter
+    def topKerningGroup(self, value):
+        self._topKerningGroup = value
+        self._changed()
 
     @property
     def unicode(self):
-        unicodes = self.unicodes
+        unicodes = self._unicodes
         if unicodes:
             return unicodes[0]
         return None
 
+    @property
+    def unicodes(self):
+        return observable_list(
+            self, "_unicodes", self._unicodes_changed, reparent=False)
+
+    @unicodes.setter
+    def unicodes(self, value):
+        self._unicodes = list(value)
+        self._unicodes_changed()
+
     def layerForMaster(self, master):
         if master is None:
             font = self._parent
@@ -72,3 +145,12 @@ class Glyph:
         layer._parent = self
         layers.append(layer)
         return layer
+
+    def _changed(self, *args):
+        self._changeCount += 1
+
+    def _unicodes_changed(self, *args):
+        self._changed()
+        font = self._parent
+        if font is not None:
+            font._codepointIndex = None
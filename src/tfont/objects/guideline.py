@@ -4,10 +4,10 @@ from typing import Any, Optional
 
 @attr.s(auto_attribs=True, cmp=False, repr=False, slots=True)
 class Guideline:
-    x: float
-    y: float
-    angle: float
-    name: str = ""
+    _x: float
+    _y: float
+    _angle: float
+    _name: str = ""
 
     _parent: Optional[Any] = attr.ib(default=None, init=False)
     selected: bool = attr.ib(default=False, init=False)
@@ -17,6 +17,50 @@ class Guideline:
         return "%s(%r, %r, angle=%r)" % (
             self.__class__.__name__, self.x, self.y, self.angle)
 
+    @property
+    def angle(self):
+        return self._angle
+
+    @angle.setter
+    def angle(self, value):
+        self._angle = value
+        parent = self._parent
+        if parent is not None:
+            parent._changed()
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self._name = value
+        parent = self._parent
+        if parent is not None:
+            parent._changed()
+
     @property
     def parent(self):
         return self._parent
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._x = value
+        parent = self._parent
+        if parent is not None:
+            parent._changed()
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self._y = value
+        parent = self._parent
+        if parent is not None:
+            parent._changed()
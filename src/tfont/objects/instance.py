@@ -1,8 +1,7 @@
 import attr
+from tfont.objects.interpolation import Interpolator
 from typing import Any, Dict, Optional
 
-# add access to interpolated glyphs --> Instance.glyphs
-
 # api to export font
 # api to convert an instance into a master?
 
@@ -36,6 +35,16 @@ class Instance:
         name = f"{self.familyName} {self.styleName}".rstrip()
         return "%s(%r%s)" % (self.__class__.__name__, name, more)
 
+    def interpolatedLayers(self, glyphNames=None, interpolator=None):
+        """
+        Returns a {glyphName: Layer} dict of the font's glyphs (or those in
+        *glyphNames*) interpolated at the instance location. Pass an
+        Interpolator of the font to reuse its master data across instances.
+        """
+        if interpolator is None:
+            interpolator = Interpolator(self._parent)
+        return interpolator.interpolateGlyphs(self.location, glyphNames)
+
     @property
     def parent(self):
         return self._parent
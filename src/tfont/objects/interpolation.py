@@ -0,0 +1,299 @@
+from array import array
+from fontTools.varLib.models import VariationModel, normalizeLocation
+from tfont.objects.anchor import Anchor
+from tfont.objects.compactPath import CompactPath, POINT_MASK, TYPE_MASK, \
+    point_flags
+from tfont.objects.component import Component
+from tfont.objects.layer import Layer
+from tfont.objects.master import Master
+from tfont.objects.misc import AlignmentZone, Matrix3x2
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class MasterData:
+    """
+    The values of a glyph's master layers stacked in a matrix, one row per
+    master that has the glyph and one column per value: width, height,
+    path coordinates, component transformations and anchor positions.
+
+    Paths, components and anchors are taken in the order of the first
+    master; layers that don't have the same structure make the glyph
+    incompatible (compatible is False).
+    """
+    __slots__ = "compatible", "masterIndices", "matrix", "_anchorNames", \
+        "_componentNames", "_pathFlags"
+
+    def __init__(self, layers):
+        # indices of the font masters that have the glyph
+        self.masterIndices = [
+            index for index, layer in enumerate(layers) if layer is not None]
+        layers = [layer for layer in layers if layer is not None]
+        first = layers[0]
+        self._pathFlags = [_path_flags(path) for path in first._paths]
+        self._componentNames = [
+            component.glyphName for component in first._components]
+        self._anchorNames = [anchor.name for anchor in first._anchors]
+        self.compatible = all(self._layer_matches(layer) for layer in layers)
+        if not self.compatible:
+            self.matrix = None
+            return
+
+        rows = [self._layer_values(layer) for layer in layers]
+        if numpy is not None:
+            self.matrix = numpy.array(rows, numpy.float64)
+        else:
+            self.matrix = rows
+
+    def interpolate(self, scalars, location):
+        """
+        Returns a Layer at *location* from the master *scalars* (one per
+        row of the matrix).
+        """
+        matrix = self.matrix
+        if numpy is not None:
+            values = array("d", numpy.dot(scalars, matrix).tobytes())
+        else:
+            values = array("d", [0.]) * len(matrix[0])
+            for scalar, row in zip(scalars, matrix):
+                if scalar:
+                    for index, value in enumerate(row):
+                        values[index] += scalar * value
+
+        paths = []
+        start = 2
+        for flags in self._pathFlags:
+            end = start + 2 * len(flags)
+            paths.append(CompactPath(values[start:end], bytearray(flags)))
+            start = end
+        components = []
+        for glyphName in self._componentNames:
+            components.append(Component(
+                glyphName, Matrix3x2(*values[start:start + 6])))
+            start += 6
+        anchors = []
+        for name in self._anchorNames:
+            anchors.append(Anchor(values[start], values[start + 1], name))
+            start += 2
+        return Layer(
+            location=dict(location),
+            width=values[0],
+            height=values[1],
+            anchors=anchors,
+            components=components,
+            paths=paths,
+        )
+
+    #
+
+    def _layer_matches(self, layer):
+        paths = layer._paths
+        if len(paths) != len(self._pathFlags):
+            return False
+        for path, flags in zip(paths, self._pathFlags):
+            if _path_flags(path).translate(_typeTable) != \
+                    flags.translate(_typeTable):
+                return False
+        if [component.glyphName for component in layer._components] != \
+                self._componentNames:
+            return False
+        return [anchor.name for anchor in layer._anchors] == self._anchorNames
+
+    def _layer_values(self, layer):
+        values = array("d", (layer.width, layer.height))
+        for path in layer._paths:
+            if path.__class__ is CompactPath:
+                values.extend(path._coordinates)
+            else:
+                for point in path._points:
+                    values.append(point.x)
+                    values.append(point.y)
+        for component in layer._components:
+            t = component.transformation
+            values.extend((t.m11, t.m12, t.m21, t.m22, t.m31, t.m32))
+        for anchor in layer._anchors:
+            values.append(anchor.x)
+            values.append(anchor.y)
+        return values
+
+
+class Interpolator:
+    """
+    Interpolates the glyphs of a font at any location of its design space,
+    from the master layers.
+
+    The master values of each glyph are gathered in a matrix the first time
+    it is interpolated, and an interpolated layer is then a weighted sum of
+    the matrix rows (a single product with numpy, if available). Call
+    invalidate() after editing glyphs, and make a new Interpolator after
+    changing the axes or masters.
+
+    A glyph that has no layer in a master is interpolated from the others
+    (sparse masters); one whose masters are incompatible is not
+    interpolated.
+    """
+    __slots__ = "_axisLimits", "_defaultIndex", "_font", "_masterData", \
+        "_masters", "_model", "_scalars"
+
+    def __init__(self, font):
+        axes = list(font.axes)
+        self._axisLimits = {
+            axis.tag: (axis.min, axis.default, axis.max) for axis in axes}
+        self._font = font
+        self._masters = masters = list(font.masters)
+        locations = [
+            normalizeLocation(master.location, self._axisLimits)
+            for master in masters]
+        for index, location in enumerate(locations):
+            if not any(location.values()):
+                self._defaultIndex = index
+                break
+        else:
+            raise ValueError("no master is at the default location of the axes")
+        self._model = VariationModel(
+            locations, axisOrder=[axis.tag for axis in axes])
+        self._masterData = {}
+        self._scalars = {}
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, self._font)
+
+    @property
+    def defaultMaster(self):
+        return self._masters[self._defaultIndex]
+
+    @property
+    def font(self):
+        return self._font
+
+    def interpolateGlyph(self, glyphName, location):
+        """
+        Returns a Layer of glyph *glyphName* interpolated at *location*
+        (an {axisTag: value} dict, missing axes are at their default), or
+        None if the glyph has no default master layer or incompatible
+        masters.
+        """
+        masterData = self._master_data(glyphName)
+        if masterData is None or not masterData.compatible:
+            return None
+        return masterData.interpolate(
+            self._master_scalars(location, masterData.masterIndices),
+            location)
+
+    def interpolateGlyphs(self, location, glyphNames=None):
+        """
+        Returns a {glyphName: Layer} dict of the glyphs named in *glyphNames*
+        (all glyphs if None) interpolated at *location*. Glyphs that have
+        incompatible masters are left out.
+        """
+        if glyphNames is None:
+            glyphNames = [glyph.name for glyph in self._font._glyphs]
+        layers = {}
+        for glyphName in glyphNames:
+            layer = self.interpolateGlyph(glyphName, location)
+            if layer is not None:
+                layers[glyphName] = layer
+        return layers
+
+    def interpolateMaster(self, location, name):
+        """
+        Returns a Master named *name* at *location*, with interpolated
+        vertical metrics, italic angle, alignment zones and stems. Zones and
+        stems come from the default master if their count differs across
+        masters.
+        """
+        masters = self._masters
+        scalars = self._master_scalars(location, range(len(masters)))
+
+        def interpolate(values):
+            return sum(scalar * value for scalar, value in zip(scalars, values))
+
+        def interpolate_lists(lists):
+            if any(len(values) != len(lists[0]) for values in lists):
+                return list(lists[self._defaultIndex])
+            return [interpolate(values) for values in zip(*lists)]
+
+        zones = [[value for zone in master.alignmentZones for value in zone]
+                 for master in masters]
+        zoneValues = interpolate_lists(zones)
+        return Master(
+            name=name,
+            location=dict(location),
+            alignmentZones=[
+                AlignmentZone(position, size) for position, size in zip(
+                    zoneValues[0::2], zoneValues[1::2])],
+            hStems=interpolate_lists([master.hStems for master in masters]),
+            vStems=interpolate_lists([master.vStems for master in masters]),
+            ascender=interpolate(master.ascender for master in masters),
+            capHeight=interpolate(master.capHeight for master in masters),
+            descender=interpolate(master.descender for master in masters),
+            italicAngle=interpolate(master.italicAngle for master in masters),
+            xHeight=interpolate(master.xHeight for master in masters),
+        )
+
+    def invalidate(self, glyphNames=None):
+        """
+        Discards the master data of the glyphs named in *glyphNames*, or of
+        all glyphs if None.
+        """
+        if glyphNames is None:
+            self._masterData.clear()
+        else:
+            for glyphName in glyphNames:
+                self._masterData.pop(glyphName, None)
+
+    #
+
+    def _master_data(self, glyphName):
+        try:
+            return self._masterData[glyphName]
+        except KeyError:
+            pass
+        glyph = self._font.glyphForName(glyphName)
+        if glyph is None:
+            return None
+        layers = []
+        for master in self._masters:
+            name = master.name
+            for layer in glyph._layers:
+                if layer.masterLayer and layer.masterName == name:
+                    layers.append(layer)
+                    break
+            else:
+                layers.append(None)
+        # other masters are relative to the default one, it can't be sparse
+        if layers[self._defaultIndex] is None:
+            return None
+        masterData = self._masterData[glyphName] = MasterData(layers)
+        return masterData
+
+    def _master_scalars(self, location, masterIndices):
+        key = (tuple(sorted(location.items())), tuple(masterIndices))
+        scalars = self._scalars.get(key)
+        if scalars is None:
+            model = self._model
+            if len(masterIndices) != len(self._masters):
+                present = set(masterIndices)
+                model, _ = model.getSubModel([
+                    True if index in present else None
+                    for index in range(len(self._masters))])
+            scalars = self._scalars[key] = model.getMasterScalars(
+                normalizeLocation(location, self._axisLimits))
+        return scalars
+
+
+def _path_flags(path):
+    if path.__class__ is CompactPath:
+        # interpolated coordinates aren't integers
+        return bytes(path._flags.translate(_pointTable))
+    return bytes(
+        point_flags(point.type, point.smooth) for point in path._points)
+
+
+# flags -> type bytes table, for bytes.translate()
+_typeTable = bytes(flags & TYPE_MASK for flags in range(256))
+# flags -> type and smooth bytes table
+_pointTable = bytes(flags & POINT_MASK for flags in range(256))
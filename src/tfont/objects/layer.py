@@ -2,22 +2,24 @@ import attr
 from tfont.objects.anchor import Anchor
 from tfont.objects.component import Component
 from tfont.objects.guideline import Guideline
-from tfont.objects.misc import Matrix3x2, observable_list
+from tfont.objects.misc import Matrix3x2, observable_list, \
+    transform_objects
 from tfont.objects.path import Path
+from tfont.util.observable import in_batch_update
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 
 @attr.s(auto_attribs=True, cmp=False, repr=False, slots=True)
 class Layer:
-    masterName: str = ""
-    name: str = ""
-    location: Optional[Dict[str, int]] = None
+    _masterName: str = ""
+    _name: str = ""
+    _location: Optional[Dict[str, int]] = None
 
-    width: Union[int, float] = 600
+    _width: Union[int, float] = 600
     # should default to ascender+descender and only be stored if different from
     # that value -- add a None value for it and a property?
-    height: Union[int, float] = 0
-    yOrigin: Optional[Union[int, float]] = None
+    _height: Union[int, float] = 0
+    _yOrigin: Optional[Union[int, float]] = None
 
     _anchors: List[Anchor] = attr.Factory(list)
     _components: List[Component] = attr.Factory(list)
@@ -25,10 +27,14 @@ class Layer:
     _paths: List[Path] = attr.Factory(list)
 
     # Color format: RGBA8888.
-    color: Optional[Tuple[int, int, int, int]] = None
+    _color: Optional[Tuple[int, int, int, int]] = None
     _extraData: Optional[Dict] = None
 
     _parent: Optional[Any] = attr.ib(default=None, init=False)
+    _observables: Optional[Dict] = attr.ib(default=None, init=False)
+    # union of the paths bounds, () if empty and None when out-of-date.
+    # points, paths and the paths list reset it when they change
+    _pathsBounds: Optional[Tuple] = attr.ib(default=None, init=False)
 
     def __attrs_post_init__(self):
         for anchor in self._anchors:
@@ -56,7 +62,7 @@ class Layer:
 
     @property
     def anchors(self):
-        return observable_list(self, self._anchors)
+        return observable_list(self, "_anchors", self._changed)
 
     @property
     def bottomMargin(self):
@@ -80,9 +86,36 @@ class Layer:
             self.yOrigin = self.height
         self.height += value - oldValue
 
+    @property
+    def bounds(self):
+        """
+        The xMin, yMin, xMax, yMax bounds of the layer's paths and components,
+        or None if it is empty. Curves are measured at their extrema.
+        """
+        bounds = self._pathsBounds
+        if bounds is None:
+            bounds = ()
+            for path in self._paths:
+                bounds = _union_bounds(bounds, path.bounds)
+            # change events are deferred during a batch update
+            if not in_batch_update():
+                self._pathsBounds = bounds
+        for component in self._components:
+            bounds = _union_bounds(bounds, _component_bounds(component))
+        return bounds or None
+
+    @property
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, value):
+        self._color = value
+        self._changed()
+
     @property
     def components(self):
-        return observable_list(self, self._components)
+        return observable_list(self, "_components", self._changed)
 
     @property
     def displayName(self):
@@ -95,11 +128,22 @@ class Layer:
         extraData = self._extraData
         if extraData is None:
             extraData = self._extraData = {}
+        # extraData is changed in place
+        self._changed()
         return extraData
 
     @property
     def guidelines(self):
-        return observable_list(self, self._guidelines)
+        return observable_list(self, "_guidelines", self._changed)
+
+    @property
+    def height(self):
+        return self._height
+
+    @height.setter
+    def height(self, value):
+        self._height = value
+        self._changed()
 
     @property
     def leftMargin(self):
@@ -117,6 +161,15 @@ class Layer:
         self.transform(Matrix3x2.create_translation(delta, 0))
         self.width += delta
 
+    @property
+    def location(self):
+        return self._location
+
+    @location.setter
+    def location(self, value):
+        self._location = value
+        self._changed()
+
     @property
     def master(self):
         try:
@@ -127,7 +180,25 @@ class Layer:
 
     @property
     def masterLayer(self):
-        return self.masterName and not self.name
+        return self._masterName and not self._name
+
+    @property
+    def masterName(self):
+        return self._masterName
+
+    @masterName.setter
+    def masterName(self, value):
+        self._masterName = value
+        self._changed()
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self._name = value
+        self._changed()
 
     @property
     def parent(self):
@@ -135,7 +206,7 @@ class Layer:
 
     @property
     def paths(self):
-        return observable_list(self, self._paths)
+        return observable_list(self, "_paths", self._paths_changed)
 
     @property
     def rightMargin(self):
@@ -177,17 +248,83 @@ class Layer:
         self.yOrigin = top + value
         self.height += value - oldValue
 
+    @property
+    def width(self):
+        return self._width
+
+    @width.setter
+    def width(self, value):
+        self._width = value
+        self._changed()
+
+    @property
+    def yOrigin(self):
+        return self._yOrigin
+
+    @yOrigin.setter
+    def yOrigin(self, value):
+        self._yOrigin = value
+        self._changed()
+
     def transform(self, matrix, selectionOnly=False):
-        for anchor in self._anchors:
-            if not selectionOnly or anchor.selected:
-                anchor.x, \
-                anchor.y = matrix.transform(anchor.x, anchor.y)
+        if not matrix:
+            return
+        transform_objects(matrix, self._anchors, selectionOnly)
         for component in self._components:
             if not selectionOnly or component.selected:
                 component.transformation *= matrix
-        for guideline in self._guidelines:
-            if not selectionOnly or guideline.selected:
-                guideline.x, \
-                guideline.y = matrix.transform(guideline.x, guideline.y)
+        transform_objects(matrix, self._guidelines, selectionOnly)
         for path in self._paths:
             path.transform(matrix, selectionOnly)
+
+    #
+
+    def _changed(self, *args):
+        glyph = self._parent
+        if glyph is not None:
+            glyph._changed()
+
+    def _paths_changed(self, sender, args):
+        self._pathsBounds = None
+        self._changed()
+
+    def _transformed_bounds(self, matrix):
+        bounds = ()
+        for path in self._paths:
+            bounds = _union_bounds(bounds, path._transformed_bounds(matrix))
+        for component in self._components:
+            layer = component.layer
+            if layer is not None:
+                bounds = _union_bounds(bounds, layer._transformed_bounds(
+                    component.transformation * matrix))
+        return bounds
+
+
+def _component_bounds(component):
+    layer = component.layer
+    if layer is None:
+        return None
+    matrix = component.transformation
+    if matrix.m12 or matrix.m21:
+        # rotation/skew: boxes don't map to boxes, measure the outline
+        return layer._transformed_bounds(matrix)
+    bounds = layer.bounds
+    if bounds is None:
+        return None
+    xMin, yMin, xMax, yMax = bounds
+    x1, y1 = matrix.transform(xMin, yMin)
+    x2, y2 = matrix.transform(xMax, yMax)
+    return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+
+
+def _union_bounds(bounds, other):
+    if not other:
+        return bounds
+    if not bounds:
+        return other
+    return (
+        min(bounds[0], other[0]),
+        min(bounds[1], other[1]),
+        max(bounds[2], other[2]),
+        max(bounds[3], other[3]),
+    )
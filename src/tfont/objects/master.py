@@ -24,6 +24,7 @@ class Master:
     vKerning: Dict[str, Dict[str, int]] = attr.Factory(dict)
 
     _parent: Optional[Any] = attr.ib(default=None, init=False)
+    _observables: Optional[Dict] = attr.ib(default=None, init=False)
 
     def __repr__(self):
         more = ""
@@ -37,11 +38,18 @@ class Master:
 
     @property
     def guidelines(self):
-        return observable_list(self, self._guidelines)
+        return observable_list(self, "_guidelines")
 
     @property
     def parent(self):
         return self._parent
 
+    #
+
+    def _changed(self, *args):
+        # guidelines report changes to their parent, only glyphs keep track
+        # of them
+        pass
+
 
 fontMasterList = lambda: [Master(name="Regular")]
@@ -1,21 +1,68 @@
+from array import array
 import attr
 from tfont.util.observable import ChangeType, ObservableList
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# below that many points, numpy call overhead outweighs the vectorization
+_NUMPY_MIN_POINTS = 16
+
+
+def observable_list(parent, name, *handlers, reparent=True):
+    """
+    Returns the observable wrapper of the list stored in *parent*'s *name*
+    attribute.
+
+    The wrapper is created on first access and cached in the parent's
+    _observables dict, so that hot loops don't allocate on every property
+    access. *handlers* are subscribed to its change_event upon creation.
+    """
+    items = getattr(parent, name)
+    observables = parent._observables
+    if observables is None:
+        observables = parent._observables = {}
+    else:
+        ol = observables.get(name)
+        if ol is not None:
+            # the attribute may have been reassigned
+            ol._list = items
+            return ol
+    ol = observables[name] = ObservableList(items)
+
+    if reparent:
+        def change_handler(sender, args):
+            is_replace = args.action == ChangeType.REPLACE
+            if args.action == ChangeType.REMOVE or is_replace:
+                for item in args.oldItems:
+                    item._parent = None
+            if args.action == ChangeType.ADD or is_replace:
+                for item in args.newItems:
+                    item._parent = parent
+        ol.change_event.append(change_handler)
+    ol.change_event.extend(handlers)
 
-def observable_list(parent, items):
-    ol = ObservableList(items)
+    return ol
 
-    def change_handler(sender, args):
-        is_replace = args.action == ChangeType.REPLACE
-        if args.action == ChangeType.REMOVE or is_replace:
-            for item in args.oldItems:
-                item._parent = None
-        if args.action == ChangeType.ADD or is_replace:
-            for item in args.newItems:
-                item._parent = parent
-    ol.change_event.append(change_handler)
 
-    return ol
+def transform_objects(matrix, objects, selectionOnly=False):
+    """
+    Applies *matrix* to the x, y attributes of *objects* (anchors,
+    guidelines).
+
+    Objects have to be read and written one by one, so this runs the
+    matrix product inline rather than through a numpy round-trip, which is
+    slower once gathering and scattering coordinates is accounted for.
+    """
+    m11, m12, m21, m22, m31, m32 = matrix
+    for obj in objects:
+        if selectionOnly and not obj.selected:
+            continue
+        x, y = obj.x, obj.y
+        obj.x = x * m11 + y * m21 + m31
+        obj.y = y * m22 + x * m12 + m32
 
 
 @attr.s(auto_attribs=True, repr=False, slots=True)
@@ -37,17 +84,17 @@ class Matrix3x2:
 
     def __imul__(self, other):
         if not other:
-            return
+            return self
         self.m11, self.m12, self.m21, self.m22, self.m31, \
             self.m32 = (
                 self.m11 * other.m11 + self.m12 * other.m21,
                 self.m11 * other.m12 + self.m12 * other.m22,
                 self.m21 * other.m11 + self.m22 * other.m21,
                 self.m21 * other.m12 + self.m22 * other.m22,
-                self.m11 * other.m31 + self.m12 * other.m32 +
-                self.m31,
-                self.m21 * other.m31 + self.m22 * other.m32 +
-                self.m32
+                self.m31 * other.m11 + self.m32 * other.m21 +
+                other.m31,
+                self.m31 * other.m12 + self.m32 * other.m22 +
+                other.m32
             )
         return self
 
@@ -71,6 +118,45 @@ class Matrix3x2:
         return x * self.m11 + y * self.m21 + self.m31, \
                y * self.m22 + x * self.m12 + self.m32
 
+    def transformPoints(self, coordinates, mask=None):
+        """
+        Transforms in-place a flat x0, y0, x1, y1... sequence of coordinates,
+        such as an array('d') or a list.
+
+        If *mask* is set, only the points whose mask item is true are
+        transformed. Large arrays are transformed with numpy, if available.
+        """
+        if not self:
+            return
+        count = len(coordinates) // 2
+        if numpy is not None and count >= _NUMPY_MIN_POINTS:
+            isBuffer = coordinates.__class__ is array and \
+                coordinates.typecode == "d"
+            if isBuffer:
+                points = numpy.frombuffer(coordinates, numpy.float64)
+            else:
+                points = numpy.array(coordinates, numpy.float64)
+            points = points.reshape(count, 2)
+            linear = numpy.array(
+                ((self.m11, self.m12), (self.m21, self.m22)))
+            translation = numpy.array((self.m31, self.m32))
+            if mask is None:
+                points[...] = points @ linear + translation
+            else:
+                mask = numpy.asarray(mask, bool)
+                points[mask] = points[mask] @ linear + translation
+            if not isBuffer:
+                coordinates[:] = points.ravel().tolist()
+            return
+        m11, m12, m21, m22, m31, m32 = self
+        for index in range(count):
+            if mask is not None and not mask[index]:
+                continue
+            i = 2 * index
+            x, y = coordinates[i], coordinates[i + 1]
+            coordinates[i] = x * m11 + y * m21 + m31
+            coordinates[i + 1] = y * m22 + x * m12 + m32
+
 
 @attr.s(auto_attribs=True, slots=True)
 class AlignmentZone:
@@ -161,22 +247,57 @@ class Rectangle:
             raise ValueError(f"width cannot be negative ('{value}')")
         self._width = value
 
+    def extend(self, xs, ys):
+        """
+        Grows the rectangle to contain the points given as sequences of x and
+        y coordinates (lists, arrays), without allocating intermediate
+        rectangles. Iterators aren't supported, they would be consumed by
+        the first of min() and max().
+        """
+        if len(xs):
+            self._union_bounds(min(xs), min(ys), max(xs), max(ys))
+
     def union(self, rectangle):
-        if self.empty:
-            self.x = rectangle.x
-            self.y = rectangle.y
-            self._width = rectangle.width
-            self._height = rectangle.height
-        else:
-            left = min(self.left, rectangle.left)
-            bottom = min(self.bottom, rectangle.bottom)
-            right = max(self.right, rectangle.right)
-            top = max(self.top, rectangle.top)
-
-            self._width = max(right - left, 0)
-            self._height = max(top - bottom, 0)
-            self.x = left
-            self.y = bottom
+        # an empty rectangle doesn't grow anything
+        if rectangle._width < 0:
+            return
+        x, y = rectangle.x, rectangle.y
+        self._union_bounds(x, y, x + rectangle._width, y + rectangle._height)
+
+    def unionAll(self, rectangles):
+        """
+        Grows the rectangle to contain all of *rectangles*, updating it only
+        once.
+        """
+        left = bottom = float("inf")
+        right = top = float("-inf")
+        for rectangle in rectangles:
+            width = rectangle._width
+            if width < 0:
+                continue
+            x, y = rectangle.x, rectangle.y
+            if x < left:
+                left = x
+            if y < bottom:
+                bottom = y
+            if x + width > right:
+                right = x + width
+            if y + rectangle._height > top:
+                top = y + rectangle._height
+        if left <= right:
+            self._union_bounds(left, bottom, right, top)
 
     def unionPt(self, x, y):
-        self.union(Rectangle(x, y))
+        self._union_bounds(x, y, x, y)
+
+    def _union_bounds(self, left, bottom, right, top):
+        if self._width >= 0:
+            x, y = self.x, self.y
+            right = max(right, x + self._width)
+            top = max(top, y + self._height)
+            left = min(left, x)
+            bottom = min(bottom, y)
+        self.x = left
+        self.y = bottom
+        self._width = right - left
+        self._height = top - bottom
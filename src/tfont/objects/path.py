@@ -2,6 +2,7 @@ import attr
 import pprint
 from tfont.objects.misc import observable_list
 from tfont.objects.point import Point
+from tfont.util.bezierMath import contourBounds
 from typing import Any, Dict, List, Optional
 
 
@@ -12,6 +13,7 @@ class Path:
     _extraData: Optional[Dict] = None
 
     _parent: Optional[Any] = attr.ib(default=None, init=False)
+    _observables: Optional[Dict] = attr.ib(default=None, init=False)
 
     def __attrs_post_init__(self):
         for point in self._points:
@@ -27,11 +29,22 @@ class Path:
             name, pprint.pformat(self._points, width=width).replace(
                 "\n ", "\n  " + " " * len(name)))  # pad indent
 
+    @property
+    def bounds(self):
+        points = self._points
+        return contourBounds(
+            [point._x for point in points],
+            [point._y for point in points],
+            [point._type for point in points],
+        )
+
     @property
     def extraData(self):
         extraData = self._extraData
         if extraData is None:
             extraData = self._extraData = {}
+        # extraData is changed in place
+        self._changed()
         return extraData
 
     @property
@@ -40,10 +53,38 @@ class Path:
 
     @property
     def points(self):
-        return observable_list(self, self._points)
+        return observable_list(self, "_points", self._bounds_changed)
 
     def transform(self, matrix, selectionOnly=False):
+        if not matrix:
+            return
+        m11, m12, m21, m22, m31, m32 = matrix
         for point in self._points:
-            if not selectionOnly or point.selected:
-                point.x, \
-                point.y = matrix.transform(point.x, point.y)
+            if selectionOnly and not point.selected:
+                continue
+            x, y = point._x, point._y
+            point._x = x * m11 + y * m21 + m31
+            point._y = y * m22 + x * m12 + m32
+        self._bounds_changed()
+
+    #
+
+    def _bounds_changed(self, *args):
+        layer = self._parent
+        if layer is not None:
+            layer._pathsBounds = None
+            layer._changed()
+
+    def _changed(self, *args):
+        layer = self._parent
+        if layer is not None:
+            layer._changed()
+
+    def _transformed_bounds(self, matrix):
+        m11, m12, m21, m22, m31, m32 = matrix
+        points = self._points
+        return contourBounds(
+            [point._x * m11 + point._y * m21 + m31 for point in points],
+            [point._y * m22 + point._x * m12 + m32 for point in points],
+            [point._type for point in points],
+        )
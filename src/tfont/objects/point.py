@@ -4,10 +4,10 @@ from typing import Any, Dict, Optional
 
 @attr.s(auto_attribs=True, cmp=False, repr=False, slots=True)
 class Point:
-    x: float
-    y: float
-    type: Optional[str] = None
-    smooth: bool = False
+    _x: float
+    _y: float
+    _type: Optional[str] = None
+    _smooth: bool = False
 
     _extraData: Optional[Dict] = None
 
@@ -15,22 +15,70 @@ class Point:
     selected: bool = attr.ib(default=False, init=False)
 
     def __repr__(self):
-        if self.type is not None:
-            more = ", %r" % self.type
+        if self._type is not None:
+            more = ", %r" % self._type
             if self.smooth:
                 more += ", smooth=%r" % self.smooth
         else:
             more = ""
         return "%s(%r, %r%s)" % (
-            self.__class__.__name__, self.x, self.y, more)
+            self.__class__.__name__, self._x, self._y, more)
 
     @property
     def extraData(self):
         extraData = self._extraData
         if extraData is None:
             extraData = self._extraData = {}
+        # extraData is changed in place
+        path = self._parent
+        if path is not None:
+            path._changed()
         return extraData
 
     @property
     def parent(self):
         return self._parent
+
+    @property
+    def smooth(self):
+        return self._smooth
+
+    @smooth.setter
+    def smooth(self, value):
+        self._smooth = value
+        path = self._parent
+        if path is not None:
+            path._changed()
+
+    @property
+    def type(self):
+        return self._type
+
+    @type.setter
+    def type(self, value):
+        self._type = value
+        path = self._parent
+        if path is not None:
+            path._bounds_changed()
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._x = value
+        path = self._parent
+        if path is not None:
+            path._bounds_changed()
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self._y = value
+        path = self._parent
+        if path is not None:
+            path._bounds_changed()
@@ -3,8 +3,14 @@ import math
 
 
 def curveBounds(p0, p1, p2, p3):
-    x0, x1, x2, x3 = p0.x, p1.x, p2.x, p3.x
-    y0, y1, y2, y3 = p0.y, p1.y, p2.y, p3.y
+    return curveBoundsXY(p0.x, p0.y, p1.x, p1.y, p2.x, p2.y, p3.x, p3.y)
+
+
+def curveBoundsXY(x0, y0, x1, y1, x2, y2, x3, y3):
+    """
+    Returns the xMin, yMin, xMax, yMax bounds of a cubic curve given as
+    scalars, taking into account its extrema.
+    """
     ts, xs, ys = [], [x0, x3], [y0, y3]
 
     for i in range(2):
@@ -36,22 +42,106 @@ def curveBounds(p0, p1, p2, p3):
         if 0 < t2 < 1:
             ts.append(t2)
 
-    for j in range(len(ts) - 1, -1, -1):
-        t = ts[j]
+    for t in ts:
         mt = 1 - t
-        xValue = mt * mt * mt * x0 + 3 * mt * mt * t * x1 + 3 * mt * t * t * x2 + t * t * t * x3
-        if len(xs) > 0:
-            xs[j] = xValue
-        else:
-            xs.append(xValue)
-        yValue = mt * mt * mt * y0 + 3 * mt * mt * t * y1 + 3 * mt * t * t * y2 + t * t * t * y3
-        if len(ys) > 0:
-            ys[j] = yValue
-        else:
-            ys.append(yValue)
+        xs.append(mt * mt * mt * x0 + 3 * mt * mt * t * x1 + 3 * mt * t * t * x2 + t * t * t * x3)
+        ys.append(mt * mt * mt * y0 + 3 * mt * mt * t * y1 + 3 * mt * t * t * y2 + t * t * t * y3)
 
     return min(xs), min(ys), max(xs), max(ys)
 
+
+def contourBounds(xs, ys, types, curveType="curve", moveType="move"):
+    """
+    Returns the xMin, yMin, xMax, yMax bounds of a contour given as parallel
+    sequences of coordinates and point types, or None if it has no points.
+    Off-curve points have a falsy type.
+
+    Curve segments are measured at their extrema rather than at their
+    off-curves. Other off-curves (e.g. qcurve) contribute their control
+    polygon, which is conservative.
+    """
+    count = len(types)
+    if not count:
+        return None
+    xMin = yMin = math.inf
+    xMax = yMax = -math.inf
+    # a closed contour starts from its last point
+    prev = -1
+    if types[0] != moveType:
+        for index in range(count - 1, -1, -1):
+            if types[index]:
+                prev = index
+                break
+    offCount = 0
+    for index in range(count):
+        type_ = types[index]
+        if not type_:
+            offCount += 1
+            continue
+        x, y = xs[index], ys[index]
+        if x < xMin:
+            xMin = x
+        if x > xMax:
+            xMax = x
+        if y < yMin:
+            yMin = y
+        if y > yMax:
+            yMax = y
+        if offCount:
+            start = index - offCount
+            if type_ == curveType and offCount == 2 and prev >= 0:
+                px, py = xs[prev], ys[prev]
+                x1, y1, x2, y2 = xs[start], ys[start], xs[index - 1], ys[index - 1]
+                # curve extrema can only exceed the bounds, which contain its
+                # endpoints, if its control points do
+                if px < xMin:
+                    xMin = px
+                if px > xMax:
+                    xMax = px
+                if py < yMin:
+                    yMin = py
+                if py > yMax:
+                    yMax = py
+                if x1 < xMin or x2 < xMin or x1 > xMax or x2 > xMax or \
+                        y1 < yMin or y2 < yMin or y1 > yMax or y2 > yMax:
+                    cxMin, cyMin, cxMax, cyMax = curveBoundsXY(
+                        px, py, x1, y1, x2, y2, x, y)
+                    if cxMin < xMin:
+                        xMin = cxMin
+                    if cyMin < yMin:
+                        yMin = cyMin
+                    if cxMax > xMax:
+                        xMax = cxMax
+                    if cyMax > yMax:
+                        yMax = cyMax
+            else:
+                for offIndex in range(start, index):
+                    cx, cy = xs[offIndex], ys[offIndex]
+                    if cx < xMin:
+                        xMin = cx
+                    if cx > xMax:
+                        xMax = cx
+                    if cy < yMin:
+                        yMin = cy
+                    if cy > yMax:
+                        yMax = cy
+            offCount = 0
+        prev = index
+    # trailing off-curves of an open contour
+    for offIndex in range(count - offCount, count):
+        cx, cy = xs[offIndex], ys[offIndex]
+        if cx < xMin:
+            xMin = cx
+        if cx > xMax:
+            xMax = cx
+        if cy < yMin:
+            yMin = cy
+        if cy > yMax:
+            yMax = cy
+    if xMin > xMax:
+        return None
+    return xMin, yMin, xMax, yMax
+
 # ------------
 # Intersection
 # ------------
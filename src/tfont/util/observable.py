@@ -1,4 +1,5 @@
-from collections.abc import MutableSequence
+from collections.abc import MutableSequence, Sequence
+from contextlib import contextmanager
 from enum import Enum, auto, unique
 from tfont.util.event import Event, EventArgs
 
@@ -41,18 +42,68 @@ class ChangeEventArgs(EventArgs):
     def oldStartingIndex(self):
         return self._oldStartingIndex
 
+# lists with deferred events, while batch_update() is active
+_batch = None
+
+
+@contextmanager
+def batch_update():
+    """
+    Defers the change events of all observable lists until the block ends,
+    then fires a single consolidated event per changed list.
+
+    Nested blocks are merged into the outermost one.
+    """
+    global _batch
+    if _batch is not None:
+        yield
+        return
+    _batch = batch = []
+    try:
+        yield
+    finally:
+        _batch = None
+        for ol in batch:
+            ol.flush_events()
+
+
+def in_batch_update():
+    return _batch is not None
+
 
 class ObservableList(MutableSequence):
-    __slots__ = "change_event", "_list"
+    __slots__ = "change_event", "_list", "_pending"
 
     def __init__(self, items):
         self._list = items
+        self._pending = None
 
         self.change_event = Event()
 
     def __delitem__(self, key):
         list_ = self._list
 
+        if key.__class__ is slice:
+            start, stop, step = key.indices(len(list_))
+            if step == 1:
+                items = tuple(list_[start:stop])
+                del list_[start:stop]
+
+                if items:
+                    self.signal_remove_range(items, start)
+            else:
+                indices = range(start, stop, step)
+                items = [list_[index] for index in indices]
+                del list_[key]
+
+                # signal from the end so that indices stay correct
+                for index, item in zip(reversed(indices), reversed(items)):
+                    self.signal_remove(item, index)
+            return
+        if key < 0:
+            key += len(list_)
+        if not 0 <= key < len(list_):
+            raise IndexError("list index out of range")
         item = list_[key]
         del list_[key]
 
@@ -67,18 +118,89 @@ class ObservableList(MutableSequence):
     def __setitem__(self, key, value):
         list_ = self._list
 
+        if key.__class__ is slice:
+            start, stop, step = key.indices(len(list_))
+            newItems = tuple(value)
+            if step == 1:
+                oldItems = tuple(list_[start:stop])
+                list_[start:stop] = newItems
+
+                if oldItems and newItems:
+                    self.signal_replace_range(oldItems, newItems, start)
+                elif oldItems:
+                    self.signal_remove_range(oldItems, start)
+                elif newItems:
+                    self.signal_add_range(newItems, start)
+            else:
+                indices = range(start, stop, step)
+                oldItems = [list_[index] for index in indices]
+                list_[key] = newItems
+
+                for index, oldItem, newItem in zip(
+                        indices, oldItems, newItems):
+                    self.signal_replace(oldItem, newItem, index)
+            return
+        if key < 0:
+            key += len(list_)
+        if not 0 <= key < len(list_):
+            raise IndexError("list index out of range")
         oldValue = list_[key]
         list_[key] = value
 
         self.signal_replace(oldValue, value, key)
 
+    def clear(self):
+        list_ = self._list
+
+        items = tuple(list_)
+        list_.clear()
+
+        if items:
+            self.signal_remove_range(items, 0)
+
+    def extend(self, values):
+        list_ = self._list
+
+        items = tuple(values)
+        index = len(list_)
+        list_.extend(items)
+
+        if items:
+            self.signal_add_range(items, index)
+
     def insert(self, index, value):
-        self._list.insert(index, value)
+        list_ = self._list
+
+        # report the effective index, like list.insert() clamps it
+        length = len(list_)
+        if index < 0:
+            index = max(index + length, 0)
+        elif index > length:
+            index = length
+        list_.insert(index, value)
 
         self.signal_add(value, index)
 
     # other methods
 
+    def __eq__(self, other):
+        # compare equal to lists and other sequences with the same items,
+        # like the lists that were exposed before
+        if other.__class__ is ObservableList:
+            return self._list == other._list
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        list_ = self._list
+        return len(list_) == len(other) and all(
+            item == otherItem for item, otherItem in zip(list_, other))
+
+    # mutable, like list
+    __hash__ = None
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
     def __iter__(self):
         return iter(self._list)
 
@@ -88,34 +210,102 @@ class ObservableList(MutableSequence):
     def __reversed__(self):
         return reversed(self._list)
 
-    # TODO: add direct extend impl?
-    # will need support for ranges in the change_event handler
-
-    #
+    def flush_events(self):
+        """
+        Fires the events deferred by batch_update() as one event spanning
+        the range that differs from the list's state before the batch.
+        """
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+
+        # rebuild the previous state by undoing the changes
+        newList = self._list
+        oldList = list(newList)
+        for args in reversed(pending):
+            action = args.action
+            if action == ChangeType.ADD:
+                index = args.newStartingIndex
+                del oldList[index:index + len(args.newItems)]
+            elif action == ChangeType.REMOVE:
+                index = args.oldStartingIndex
+                oldList[index:index] = args.oldItems
+            else:
+                index = args.newStartingIndex
+                oldList[index:index + len(args.newItems)] = args.oldItems
+        # strip the common head and tail
+        oldLength, newLength = len(oldList), len(newList)
+        length = min(oldLength, newLength)
+        start = 0
+        while start < length and oldList[start] is newList[start]:
+            start += 1
+        end = 0
+        length -= start
+        while end < length and oldList[-1 - end] is newList[-1 - end]:
+            end += 1
+        oldItems = tuple(oldList[start:oldLength - end])
+        newItems = tuple(newList[start:newLength - end])
+
+        if oldItems and newItems:
+            args = ChangeEventArgs(
+                ChangeType.REPLACE, oldItems, start, newItems, start)
+        elif oldItems:
+            args = ChangeEventArgs(
+                ChangeType.REMOVE, oldItems, start, None, None)
+        elif newItems:
+            args = ChangeEventArgs(
+                ChangeType.ADD, None, None, newItems, start)
+        else:
+            return
+        # bypass _notify(), we may be flushing within a batch
+        self.change_event(self, args)
+
+    # signals. range variants fire a single event for contiguous items
 
     def signal_add(self, item, index):
-        self.change_event(self, EventArgs(
+        self.signal_add_range((item,), index)
+
+    def signal_add_range(self, items, index):
+        self._notify(ChangeEventArgs(
             ChangeType.ADD,
-            (item,),
-            index,
             None,
             None,
+            items,
+            index,
         ))
 
     def signal_remove(self, item, index):
-        self.change_event(self, EventArgs(
+        self.signal_remove_range((item,), index)
+
+    def signal_remove_range(self, items, index):
+        self._notify(ChangeEventArgs(
             ChangeType.REMOVE,
+            items,
+            index,
             None,
             None,
-            (item,),
-            index,
         ))
 
     def signal_replace(self, oldItem, newItem, index):
-        self.change_event(self, EventArgs(
+        self.signal_replace_range((oldItem,), (newItem,), index)
+
+    def signal_replace_range(self, oldItems, newItems, index):
+        self._notify(ChangeEventArgs(
             ChangeType.REPLACE,
-            (oldItem,),
+            oldItems,
             index,
-            (newItem,),
+            newItems,
             index
-        ))
\ No newline at end of file
+        ))
+
+    def _notify(self, args):
+        batch = _batch
+        if batch is not None:
+            pending = self._pending
+            if pending is None:
+                pending = self._pending = []
+                batch.append(self)
+            pending.append(args)
+        else:
+            self.change_event(self, args)